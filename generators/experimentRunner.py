@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+import hashlib
+import json
+import multiprocessing
+import numpy as np
+import os.path
+import random
+import time
+from utils.experimentCatalog import open_catalog
+
+# The generators run performExperiments once per (model, year, batch).
+# These units are independent from each other, so runExperiments can
+# shard them across a pool of worker processes. The workers are forked
+# from the generator, so they inherit the probability tables already
+# loaded by it; generators whose tables depend on the model give a
+# prepare(modelDict) function that loads them in the worker only when
+# they change. Every unit writes to the same
+# Experiments/<N>kTrials/BatchXX folder as a serial run.
+#
+# Given a master seed (--seed=S), every unit seeds random and
+# np.random with a seed derived from the master seed and the unit
+# (model, year, batch) before it starts. Each unit then draws from its
+# own stream, and the results do not depend on the number of workers
+# or on the order in which the units run.
+#
+# Every completed unit is recorded in the experiment catalog
+# (Experiments/catalog.sqlite, see utils/experimentCatalog.py) with its
+# seed, runtime and, if performExperiments returns the entry of
+# ExperimentScores.saveScores, where its scores were saved. Only this
+# process writes to the catalog, the workers send their entries back.
+
+
+# This function removes the option --name=value from argv (so the
+# positional arguments keep their indices) and returns its value.
+def popOption(argv, name, default=None):
+    prefix = '--{0}='.format(name)
+    for i, arg in enumerate(argv):
+        if arg.startswith(prefix):
+            del argv[i]
+            return arg[len(prefix):]
+    return default
+
+
+def experimentsFolder(numTrials):
+    if numTrials < 1000:
+        return 'Experiments/{0}Trials'.format(numTrials)
+    return 'Experiments/{0}kTrials'.format(int(numTrials / 1000))
+
+
+def batchFolder(numTrials, batchNumber):
+    return '{0}/Batch{1:02d}'.format(experimentsFolder(numTrials), batchNumber)
+
+
+# The folders are created before starting the workers so they never
+# race to create the same folder.
+def makeBatchFolders(numTrials, numBatches):
+    for batchNumber in range(numBatches):
+        batchFolderName = batchFolder(numTrials, batchNumber)
+        if not os.path.exists(batchFolderName):
+            os.makedirs(batchFolderName)
+
+
+def experimentUnits(modelsList, years, numBatches):
+    return [(modelDict, year, batchNumber)
+            for modelDict in modelsList
+            for year in years
+            for batchNumber in range(numBatches)]
+
+
+# This function returns the seed of a unit, a hash of the master seed,
+# the model definition, the year and the batch number. Units that differ
+# in any of them get unrelated streams.
+def unitSeed(masterSeed, modelDict, year, batchNumber):
+    key = json.dumps([masterSeed, modelDict, year, batchNumber], sort_keys=True)
+    return int(hashlib.sha1(key.encode()).hexdigest()[:8], 16)
+
+
+def seedUnit(masterSeed, modelDict, year, batchNumber):
+    if masterSeed is None:
+        return
+    seed = unitSeed(masterSeed, modelDict, year, batchNumber)
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def recordUnit(catalog, numTrials, modelDict, year, batchNumber, masterSeed, elapsed, saved):
+    seed = None if masterSeed is None else unitSeed(masterSeed, modelDict, year, batchNumber)
+    catalog.record(modelDict['modelName'], numTrials, year, batchNumber, config=modelDict,
+                   seed=seed, runtime=elapsed, **(saved or {}))
+
+
+worker = {}
+
+
+def initWorker(performExperiments, prepare):
+    # forked workers start with the random state of the generator, so
+    # they have to be reseeded or they would all generate the same
+    # brackets
+    random.seed()
+    np.random.seed()
+    worker['performExperiments'] = performExperiments
+    worker['prepare'] = prepare
+
+
+def runUnit(task):
+    numTrials, modelDict, year, batchNumber, masterSeed = task
+    start = time.time()
+    if worker['prepare'] is not None:
+        worker['prepare'](modelDict)
+    seedUnit(masterSeed, modelDict, year, batchNumber)
+    saved = worker['performExperiments'](numTrials, year, batchNumber, modelDict)
+    return modelDict, year, batchNumber, time.time() - start, saved
+
+
+def runSerially(performExperiments, numTrials, units, prepare, masterSeed, catalog):
+    lastModel = lastYear = None
+    for modelDict, year, batchNumber in units:
+        if modelDict is not lastModel:
+            print '{0:<8s}: {1}'.format(modelDict['modelName'], time.strftime("%Y-%m-%d %H:%M"))
+            lastModel, lastYear = modelDict, None
+            if prepare is not None:
+                prepare(modelDict)
+        if year != lastYear:
+            print '\t {0}: {1}'.format(year, time.strftime("%Y-%m-%d %H:%M"))
+            lastYear = year
+        print '\t\t {0}: {1}'.format(batchNumber, time.strftime("%Y-%m-%d %H:%M"))
+        start = time.time()
+        seedUnit(masterSeed, modelDict, year, batchNumber)
+        saved = performExperiments(numTrials, year, batchNumber, modelDict)
+        recordUnit(catalog, numTrials, modelDict, year, batchNumber, masterSeed, time.time() - start, saved)
+
+
+# This function runs performExperiments(numTrials, year, batchNumber,
+# modelDict) for every (modelDict, year, batchNumber) unit, in
+# numWorkers processes (or in this process if numWorkers is 1). If
+# masterSeed is given, the results are reproducible (see unitSeed).
+def runExperiments(performExperiments, numTrials, units, numWorkers=1, prepare=None, masterSeed=None):
+    if len(units) == 0:
+        return
+    makeBatchFolders(numTrials, max(batchNumber for _, _, batchNumber in units) + 1)
+
+    if numWorkers <= 1:
+        catalog = open_catalog()
+        try:
+            runSerially(performExperiments, numTrials, units, prepare, masterSeed, catalog)
+        finally:
+            catalog.close()
+        return
+
+    # the tables of the first model are loaded before forking, so the
+    # workers only load tables again for models that need other ones
+    if prepare is not None:
+        prepare(units[0][0])
+
+    print 'Running {0} experiments in {1} workers: {2}'.format(
+        len(units), numWorkers, time.strftime("%Y-%m-%d %H:%M"))
+    pool = multiprocessing.Pool(numWorkers, initWorker, (performExperiments, prepare))
+    # opened after forking the workers, which never use the connection
+    catalog = open_catalog()
+    try:
+        tasks = [(numTrials, modelDict, year, batchNumber, masterSeed) for modelDict, year, batchNumber in units]
+        for modelDict, year, batchNumber, elapsed, saved in pool.imap_unordered(runUnit, tasks):
+            print '\t {0:<8s} {1} {2:02d}: {3} ({4:.1f}s)'.format(
+                modelDict['modelName'], year, batchNumber, time.strftime("%Y-%m-%d %H:%M"), elapsed)
+            recordUnit(catalog, numTrials, modelDict, year, batchNumber, masterSeed, elapsed, saved)
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        catalog.close()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+import numpy as np
+from scoringUtils import ReferenceScorer
+from utils.bracketPacking import as_packed, pool_diversity
+from utils.poolStats import histogram_metrics, score_histogram
+from utils.scoreStore import SCORE_DTYPE, save_histogram, save_scores, scores_basename
+
+# These utilities are shared by the performExperiments functions
+# of the generators.
+
+
+# Collects the scores of the brackets generated for one batch.
+# By default only the total score of every bracket is computed.
+# If the model sets saveRoundScores, the per-round breakdown is
+# also kept in an (N, 6) uint16 array (rounds 1-6) that is saved
+# next to the generatedScores file. The scores are saved as a
+# uint16 .npy file unless the model sets scoreFormat to 'json', or
+# to 'hist' to keep only their 193-bin histogram. With
+# saveScoreHistogram the histogram is also saved next to the scores
+# (see utils/scoreStore.py). The brackets are kept packed, one
+# uint64 each, so that the diversity of the whole pool (see
+# pool_diversity) is reported with the metrics of the scores, and
+# every distinct bracket of a batch is scored only once unless the
+# model sets dedupScoring to false.
+class ExperimentScores:
+    def __init__(self, model, correctVector, numTrials):
+        self.scorer = ReferenceScorer(correctVector)
+        self.actualBracket = ''.join(str(bit) for bit in correctVector)
+        self.bracketFormat = model.get('format', 'TTT')
+        self.scoreFormat = model.get('scoreFormat', 'npy')
+        self.keepHistogram = model.get('saveScoreHistogram', False)
+        self.keepRoundScores = model.get('saveRoundScores', False)
+        self.dedupScoring = model.get('dedupScoring', True)
+        self.packed = np.zeros(numTrials, dtype=np.uint64)
+        self.scores = np.zeros(numTrials, dtype=SCORE_DTYPE)
+        if self.keepRoundScores:
+            self.roundScores = np.zeros((numTrials, 6), dtype=np.uint16)
+        else:
+            self.roundScores = None
+
+    def add(self, n, bracketVector):
+        self.packed[n] = as_packed(bracketVector)[0]
+        if self.keepRoundScores:
+            bracketScore = self.scorer.score(bracketVector, bracketFormat=self.bracketFormat)[0]
+            self.roundScores[n] = bracketScore[1:]
+            self.scores[n] = bracketScore[0]
+        else:
+            self.scores[n] = self.scorer.scoreTotal(bracketVector, self.bracketFormat)
+
+    def addBatch(self, start, brackets):
+        packed = as_packed(brackets)
+        end = start + packed.size
+        self.packed[start:end] = packed
+        if self.keepRoundScores:
+            if self.dedupScoring:
+                roundScores = self.scorer.scoreUnique(packed, bracketFormat=self.bracketFormat)
+            else:
+                roundScores = self.scorer.score(packed, bracketFormat=self.bracketFormat)
+            self.roundScores[start:end] = roundScores[:, 1:]
+            totals = roundScores[:, 0]
+        elif self.dedupScoring:
+            totals = self.scorer.scoreUniqueTotals(packed, self.bracketFormat)
+        else:
+            totals = self.scorer.scoreTotals(packed, self.bracketFormat)
+        self.scores[start:end] = totals
+
+    # Returns where and how the scores were saved, with their summary
+    # metrics, for the experiment catalog (see experimentRunner.py).
+    def saveScores(self, batchFolderName, modelName, year):
+        basename = scores_basename(batchFolderName, modelName, year)
+        save_scores(basename, self.scores, year, self.actualBracket, self.scoreFormat)
+        histogram = score_histogram(self.scores)
+        if self.keepHistogram and self.scoreFormat != 'hist':
+            save_histogram(basename, histogram, year, self.actualBracket)
+        metrics = histogram_metrics(histogram)
+        metrics['diversity'] = pool_diversity(self.packed)
+        return {'path': basename, 'fmt': self.scoreFormat,
+                'histogram': self.keepHistogram or self.scoreFormat == 'hist',
+                'metrics': metrics}
+
+    def save(self, batchFolderName, modelName, year):
+        if self.keepRoundScores:
+            np.save(roundScoresFilename(batchFolderName, modelName, year), self.roundScores)
+
+
+def roundScoresFilename(batchFolderName, modelName, year):
+    return '{2}/roundScores_{0}_{1}.npy'.format(modelName, year, batchFolderName)
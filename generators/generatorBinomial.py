@@ -6,12 +6,20 @@ import os.path
 import sys
 
 from scoringUtils import getActualBracketVector
-from scoringUtils import scoreFFFBracket, scoreBracket
+from experimentUtils import ExperimentScores
+from experimentRunner import batchFolder, experimentUnits
+from experimentRunner import popOption, runExperiments
 from utils.runtimeSummary import RuntimeSummary
+from utils.historyCube import HistoryCube
 from samplingUtils import getChampion, getRunnerUp
 from samplingUtils import getE8SeedBottom, getE8SeedTop
 from samplingUtils import getF4SeedSplit, getF4SeedTogether
+from samplingUtils import getChampions, getRunnerUps
+from samplingUtils import getE8SeedsBottom, getE8SeedsTop
+from samplingUtils import getF4SeedsSplit, getF4SeedsTogether
 from numbers import Number
+from patternTables import loadPatternTables
+from patternSampling import fillPatterns, samplePatterns, setPatterns
 
 
 def load_ref_brackets(fmt='TTT'):
@@ -24,6 +32,8 @@ def load_ref_brackets(fmt='TTT'):
     return vectors
 
 probs = {}
+# cumulative counts of the historical brackets (see utils/historyCube.py)
+history = None
 all_triplets = {
     'E8_F4': {
         'bits': [12, 13, 14]
@@ -414,25 +424,22 @@ def fill_all_pattern_probs():
     global all_patterns, CONDITIONALS
     names = list(all_patterns.keys())
     for year in range(2013, 2020):
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
-        vectors = vectors[:, :60].reshape(-1, 15)
         for name in names:
             triplet = all_patterns[name]['bits']
             if np.greater(triplet, 14).any():
                 continue
-            triplets, counts = np.unique(vectors[:, triplet], axis=0, return_counts=True)
+            triplets, counts = history.pattern_counts_before(triplet, year, pooled=True)
             cdf = [1. * counts[:i].sum() / counts.sum()
                    for i in range(len(counts) + 1)]
             all_patterns[name][year] = {
                 'p': cdf,
                 'triplets': triplets
             }
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
         for name in names:
             triplet = all_patterns[name]['bits']
             if np.greater(14, triplet).all():
                 continue
-            triplets, counts = np.unique(vectors[:, triplet], axis=0, return_counts=True)
+            triplets, counts = history.pattern_counts_before(triplet, year)
             cdf = [1. * counts[:i].sum() / counts.sum()
                    for i in range(len(counts) + 1)]
             all_patterns[name][year] = {
@@ -452,7 +459,7 @@ def fill_all_pattern_probs():
             CONDITIONALS[key] = {}
             for year in range(2013, 2020):
                 CONDITIONALS[key][year] = {}
-                vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
+                vectors = history.vectors_before(year)
                 region_vectors = vectors[:, :60].reshape(-1, 15)
                 for name in names:
                     triplet = all_patterns[name]['bits']
@@ -489,7 +496,7 @@ def fill_all_pattern_probs():
             for year in range(2013, 2020):
                 if year not in CONDITIONALS[key]:
                     CONDITIONALS[key][year] = {}
-                vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
+                vectors = history.vectors_before(year)
                 region_vectors = vectors[:, :60].reshape(-1, 15)
                 for name in names:
                     triplet = all_patterns[name]['bits']
@@ -517,25 +524,22 @@ def fill_triplet_probs():
     global all_triplets
     names = list(all_triplets.keys())
     for year in range(2013, 2020):
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
-        vectors = vectors[:, :60].reshape(-1, 15)
         for name in names:
             triplet = all_triplets[name]['bits']
             if np.greater(triplet, 14).any():
                 continue
-            triplets, counts = np.unique(vectors[:, triplet], axis=0, return_counts=True)
+            triplets, counts = history.pattern_counts_before(triplet, year, pooled=True)
             cdf = [1. * counts[:i].sum() / counts.sum()
                    for i in range(len(counts) + 1)]
             all_triplets[name][year] = {
                 'p': cdf,
                 'triplets': triplets
             }
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
         for name in names:
             triplet = all_triplets[name]['bits']
             if np.greater(14, triplet).all():
                 continue
-            triplets, counts = np.unique(vectors[:, triplet], axis=0, return_counts=True)
+            triplets, counts = history.pattern_counts_before(triplet, year)
             cdf = [1. * counts[:i].sum() / counts.sum()
                    for i in range(len(counts) + 1)]
             all_triplets[name][year] = {
@@ -548,25 +552,22 @@ def fill_path_probs():
     global all_paths
     names = list(all_paths.keys())
     for year in range(2013, 2020):
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
-        vectors = vectors[:, :60].reshape(-1, 15)
         for name in names:
             triplet = all_paths[name]['bits']
             if np.greater(triplet, 14).any():
                 continue
-            triplets, counts = np.unique(vectors[:, triplet], axis=0, return_counts=True)
+            triplets, counts = history.pattern_counts_before(triplet, year, pooled=True)
             cdf = [1. * counts[:i].sum() / counts.sum()
                    for i in range(len(counts) + 1)]
             all_paths[name][year] = {
                 'p': cdf,
                 'triplets': triplets
             }
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
         for name in names:
             triplet = all_paths[name]['bits']
             if np.greater(14, triplet).all():
                 continue
-            triplets, counts = np.unique(vectors[:, triplet], axis=0, return_counts=True)
+            triplets, counts = history.pattern_counts_before(triplet, year)
             cdf = [1. * counts[:i].sum() / counts.sum()
                    for i in range(len(counts) + 1)]
             all_paths[name][year] = {
@@ -575,6 +576,36 @@ def fill_path_probs():
             }
 
 
+# Fills the pattern tables of the format, computing them only if
+# they are not cached on disk yet (see patternTables.py).
+def load_pattern_tables(fmt):
+    def compute():
+        fill_all_pattern_probs()
+        fill_triplet_probs()
+        fill_path_probs()
+    groups = {'all_patterns': all_patterns, 'all_triplets': all_triplets, 'all_paths': all_paths}
+    loadPatternTables(fmt, all_brackets, groups, CONDITIONALS, compute)
+
+
+# The probabilities and pattern tables only depend on the format, so
+# they are only loaded again when a model uses another format.
+tablesFormat = None
+
+
+def prepareModel(modelDict):
+    global all_brackets, history, tablesFormat
+    fmt = modelDict.get('format', 'TTT')
+    if fmt != tablesFormat:
+        all_brackets = load_ref_brackets(fmt)
+        # calculate bitwise MLE probs
+        history = HistoryCube(all_brackets, fmt)
+        for year in range(2013, 2020):
+            probs[year] = history.bit_probs_before(year)
+
+        load_pattern_tables(fmt)
+        tablesFormat = fmt
+
+
 def getP(model, year, bit_id):
     if model.get('annealing_model') is not None and bit_id < 60 and (bit_id % 15) < 8:
         if model.get('binomial'):
@@ -591,11 +622,30 @@ def getP(model, year, bit_id):
     return np.clip(p, 0., 1.)
 
 
+# This function returns the probabilities of the given bits (all 63 by
+# default) of n brackets as an (n, bits) array, the same as calling
+# getP for every bracket and bit: the base probabilities are looked up
+# once and every bracket draws its own perturbation.
+def getProbabilities(model, year, n, bits=None):
+    bits = np.arange(63) if bits is None else np.asarray(bits)
+    base_p = np.asarray(probs[year], dtype=float)[bits]
+    if model.get('perturbation') and isinstance(model['perturbation'], Number):
+        if model.get('perturbationType') == 'fixed':
+            p = base_p + np.random.uniform(-model['perturbation'], model['perturbation'], (n, bits.size))
+        else:
+            p = np.random.uniform((1 - model['perturbation']) * base_p, (1 + model['perturbation']) * base_p,
+                                  (n, bits.size))
+    else:
+        p = np.tile(base_p, (n, 1))
+    if model.get('annealing_model') is not None:
+        isAnnealed = (bits < 60) & (bits % 15 < 8)
+        annealed = binomial_probs if model.get('binomial') else perturbed_ps
+        p[:, isAnnealed] = np.asarray(annealed[model.get('annealing_model')])[bits[isAnnealed] % 15]
+    return np.clip(p, 0., 1.)
+
+
 def getValues(bracket, year, pattern_key):
-    n = np.random.rand()
-    for i in range(8):
-        if n > all_patterns[pattern_key][year]['p'][i] and n < all_patterns[pattern_key][year]['p'][i + 1]:
-            return all_patterns[pattern_key][year]['triplets'][i]
+    return samplePatterns(all_patterns[pattern_key][year])
 
 
 def fixRegionalBits(winner):
@@ -648,65 +698,79 @@ def fixBitsFromNCG(bracket, champion, runnerUp):
     return bracket
 
 
-def fillByBinomialSeedWins(model, year, bracket):
-    r1_probs = [getP(model, year, i) for i in range(8)]
-    counts = [np.random.binomial(4, r1_prob) for r1_prob in r1_probs]
-    positions = [np.random.choice([0, 1, 2, 3], count, replace=False)
-                 for count in counts]
-
-    for bit, pos in enumerate(positions):
-        for region in range(4):
-            if region in pos:
-                bracket[region * 15 + bit] = 1
-            else:
-                bracket[region * 15 + bit] = 0
-    return bracket
-
-
-def genBracketWithoutEndModel(model, year):
-    n = np.random.rand(63)
-    p = [getP(model, year, i) for i in range(63)]
-    bracket = (n < p).astype(int)
-
-    bracket = fillByBinomialSeedWins(model, year, bracket)
-
-    for region in range(4):
-        for t in model.get('triplets', []):
-            n = np.random.rand()
-            for i in range(8):
-                if n > all_triplets[t][year]['p'][i] and n < \
-                        all_triplets[t][year]['p'][i + 1]:
-                    bracket[15 * region + np.array(all_triplets[t]['bits'])] = \
-                    all_triplets[t][year]['triplets'][i]
-                    break
-
-        for t in model.get('paths', []):
-            n = np.random.rand()
-            for i in range(8):
-                if n > all_paths[t][year]['p'][i] and n < \
-                        all_paths[t][year]['p'][i + 1]:
-                    bracket[15 * region + np.array(all_paths[t]['bits'])] = \
-                    all_paths[t][year]['triplets'][i]
-                    break
+# Rows of REGIONAL_FIXED_BITS indexed by seed (row 0 is unused), so the
+# bits of many regions can be fixed with a single lookup.
+FIXED_BITS_TABLE = np.array([np.repeat(-1, 15)] + [REGIONAL_FIXED_BITS[seed] for seed in range(1, 17)])
+
+
+# This function returns the regions of the champion and the runner-up
+# of every bracket of an (n, 63) pool given their last three bits.
+def getNCGRegions(brackets):
+    topWins = brackets[:, 62] == 1
+    region0Wins = np.where(brackets[:, 60] == 1, 0, 1)
+    region2Wins = np.where(brackets[:, 61] == 1, 2, 3)
+    championRegion = np.where(topWins, region0Wins, region2Wins)
+    ruRegion = np.where(topWins, region2Wins, region0Wins)
+    return championRegion, ruRegion
+
+
+# This function fixes the bits of the regions of the champion and the
+# runner-up of every bracket of an (n, 63) pool, see fixBitsFromNCG.
+def fixBitsFromNCGBatch(brackets, champion, runnerUp):
+    rows = np.arange(brackets.shape[0])
+    championRegion, ruRegion = getNCGRegions(brackets)
+    regions = brackets[:, :60].reshape(-1, 4, 15)
+    regions[rows, championRegion] = FIXED_BITS_TABLE[champion]
+    regions[rows, ruRegion] = FIXED_BITS_TABLE[runnerUp]
+    brackets[:, :60] = regions.reshape(-1, 60)
+    return brackets
+
+
+# Round 1 bits of the brackets as an (8, 4) array, bit by region
+ROUND1_BITS = 15 * np.arange(4)[np.newaxis, :] + np.arange(8)[:, np.newaxis]
+
+
+# This function sets the Round 1 bits of a pool of brackets: for every
+# Round 1 bit, the number of regions where the better seed wins is sampled from a binomial distribution and the
+# winning regions are chosen uniformly at random. Only the bits that
+# are still pending are set.
+def fillByBinomialSeedWinsBatch(model, year, brackets):
+    n = brackets.shape[0]
+    r1_probs = getProbabilities(model, year, n, np.arange(8))
+    counts = np.random.binomial(4, r1_probs)
+    ranks = np.argsort(np.random.rand(n, 8, 4), axis=2).argsort(axis=2)
+    wins = (ranks < counts[:, :, np.newaxis]).astype(int)
+    r1 = brackets[:, ROUND1_BITS]
+    brackets[:, ROUND1_BITS] = np.where(r1 == -1, wins, r1)
+    return brackets
+
+
+# This function generates n brackets without endModel as an (n, 63)
+# array: every bit is drawn from its probability, the Round 1 bits are
+# then replaced by fillByBinomialSeedWinsBatch and the triplets and
+# paths of the model overwrite their bits, in all regions of all
+# brackets at once.
+def genBracketsWithoutEndModel(model, year, n):
+    brackets = (np.random.rand(n, 63) < getProbabilities(model, year, n)).astype(int)
+    # the Round 1 bits are set by the number of regions where the
+    # better seed wins
+    brackets[:, ROUND1_BITS] = -1
+    brackets = fillByBinomialSeedWinsBatch(model, year, brackets)
+
+    regionOffsets = 15 * np.arange(4)[:, np.newaxis]
+    for t in model.get('triplets', []):
+        setPatterns(brackets, regionOffsets + np.array(all_triplets[t]['bits']), all_triplets[t][year])
+
+    for t in model.get('paths', []):
+        setPatterns(brackets, regionOffsets + np.array(all_paths[t]['bits']), all_paths[t][year])
 
     # non-regional patterns
     for t in model.get('non-regional-triplets', []):
-        n = np.random.rand()
-        for i in range(8):
-            if n > all_triplets[t][year]['p'][i] and n < \
-                    all_triplets[t][year]['p'][i + 1]:
-                bracket[np.array(all_triplets[t]['bits'])] = \
-                all_triplets[t][year]['triplets'][i]
-                break
+        setPatterns(brackets, np.array(all_triplets[t]['bits']), all_triplets[t][year])
 
     for t in model.get('non-regional-paths', []):
-        n = np.random.rand()
-        for i in range(8):
-            if n > all_paths[t][year]['p'][i] and n < all_paths[t][year]['p'][i + 1]:
-                bracket[np.array(all_paths[t]['bits'])] = \
-                all_paths[t][year]['triplets'][i]
-                break
-    return bracket
+        setPatterns(brackets, np.array(all_paths[t]['bits']), all_paths[t][year])
+    return brackets
 
 
 def getE8Bracket(model, year):
@@ -734,7 +798,7 @@ def getE8Bracket(model, year):
                 bracket[region * 15 + bit] = 1
             else:
                 bracket[region * 15 + bit] = 0
-    return fillEmptySpaces(bracket, model, year)
+    return bracket
 
 def getF4ABracket(model, year):
     bracket = np.repeat(-1, 63)
@@ -756,7 +820,7 @@ def getF4ABracket(model, year):
                 bracket[region * 15 + bit] = 1
             else:
                 bracket[region * 15 + bit] = 0
-    return fillEmptySpaces(bracket, model, year)
+    return bracket
 
 def getF4BBracket(model, year):
     bracket = np.repeat(-1, 63)
@@ -779,7 +843,7 @@ def getF4BBracket(model, year):
             else:
                 bracket[region * 15 + bit] = 0
 
-    return fillEmptySpaces(bracket, model, year)
+    return bracket
 
 def genNCGBracket(model, year):
     bracket = np.repeat(-1, 63)
@@ -805,7 +869,7 @@ def genNCGBracket(model, year):
                 bracket[region * 15 + bit] = 0
 
 
-    return fillEmptySpaces(bracket, model, year)
+    return bracket
 
 
 def getCombinedEndModelBracket(model, year):
@@ -839,67 +903,37 @@ def getCombinedEndModelBracket(model, year):
         assert np.all(bracket[[14, 29, 44, 59]] != -1)
     except:
         import pdb; pdb.set_trace()
-    return fillEmptySpaces(bracket, model, year)
+    return bracket
 
 
+# This function fills the pending bits (-1) of a partial bracket, or of
+# an (N, 63) pool of partial brackets, first with the patterns of the
+# model and then with the probabilities of the bits.
 def fillEmptySpaces(bracket, model, year):
+    brackets = np.atleast_2d(bracket)
     for key in ['non-regional-paths', 'non-regional-triplets']:
         for t in model.get(key, []):
-            n = np.random.rand()
-            selector = all_patterns[t]['bits']
-            if np.all(bracket[selector] == -1):
-                for i in range(8):
-                    if n > all_patterns[t][year]['p'][i] and n < all_patterns[t][year]['p'][i + 1]:
-                        bracket[selector] = all_patterns[t][year]['triplets'][i]
-                        break
-            elif np.all(bracket[selector] != -1):
-                continue
-            else:
-                bits = np.array([0, 1, 2])[bracket[selector] != -1]
-                pending = np.array([0, 1, 2])[bracket[selector] == -1]
-                values = bracket[selector][bits]
-                cond_table_key = tuple(zip(bits, values))
-                try:
-                    cdf = CONDITIONALS[cond_table_key][year][t]
-                except:
-                    import pdb; pdb.set_trace()
-                for i in range(len(cdf)):
-                    if n > cdf['p'][i] and n < cdf['p'][i + 1]:
-                        bracket[pending] = cdf['triplets'][i]
+            fillPatterns(brackets, all_patterns[t]['bits'], all_patterns[t][year],
+                         lambda cond_table_key: CONDITIONALS[cond_table_key][year][t])
 
     for key in ['paths', 'triplets']:
         for t in model.get(key, []):
             for region in range(4):
-                n = np.random.rand()
-                selector = all_patterns[t]['bits'] + region * 15
-                if np.all(bracket[selector] == -1):
-                    for i in range(8):
-                        if n > all_patterns[t][year]['p'][i] and n < all_patterns[t][year]['p'][i + 1]:
-                            bracket[selector] = all_patterns[t][year]['triplets'][i]
-                            break
-                elif np.all(bracket[selector] != -1):
-                    continue
-                else:
-                    bits = np.array([0, 1, 2])[bracket[selector] != -1]
-                    pending = np.array([0, 1, 2])[bracket[selector] == -1]
-                    values = bracket[selector][bits]
-                    cond_table_key = tuple(zip(bits, values))
-                    cdf = CONDITIONALS[cond_table_key][year][t]
-                    for i in range(len(cdf)):
-                        if n > cdf['p'][i] and n < cdf['p'][i + 1]:
-                            bracket[pending] = cdf['triplets'][i]
-
-    for bit in range(63):
-        if bracket[bit] == -1:
-            n = np.random.rand()
-            bracket[bit] = 1 if n < getP(model, year, bit) else 0
+                fillPatterns(brackets, all_patterns[t]['bits'] + region * 15, all_patterns[t][year],
+                             lambda cond_table_key: CONDITIONALS[cond_table_key][year][t])
+
+
+    pending = brackets == -1
+    if pending.any():
+        p = getProbabilities(model, year, brackets.shape[0])
+        brackets[pending] = np.random.rand(np.count_nonzero(pending)) < p[pending]
     return bracket
 
 
-def generateBracket(model, year):
-    if model.get('endModel') is None:
-        return genBracketWithoutEndModel(model, year)
-    elif model['endModel'] == 'NCG':
+# This function fixes the bits of the model's endModel in an otherwise
+# empty bracket (-1 marks the pending bits).
+def getPartialBracket(model, year):
+    if model['endModel'] == 'NCG':
         return genNCGBracket(model, year)
     elif model['endModel'] == 'F4_A':
         return getF4ABracket(model, year)
@@ -913,39 +947,92 @@ def generateBracket(model, year):
         raise Exception('Not implemented yet')
 
 
+# This function builds the partial brackets of n brackets at once, as
+# getPartialBracket does for one bracket, sampling the seeds fixed by
+# the endModel for the whole pool together.
+def getPartialBrackets(model, year, n):
+    endModel = model['endModel']
+    brackets = np.repeat(-1, n * 63).reshape(n, 63)
+    if endModel == 'E8':
+        bottom = FIXED_BITS_TABLE[getE8SeedsBottom(year, 4 * n, model)]
+        top = FIXED_BITS_TABLE[getE8SeedsTop(year, 4 * n, model)]
+        regions = np.where(top != -1, top, bottom)
+        regions[:, -1] = -1
+        brackets[:, :60] = regions.reshape(n, 60)
+        brackets = fillByBinomialSeedWinsBatch(model, year, brackets)
+    elif endModel == 'F4_A':
+        brackets[:, :60] = FIXED_BITS_TABLE[getF4SeedsTogether(year, 4 * n, model)].reshape(n, 60)
+        brackets = fillByBinomialSeedWinsBatch(model, year, brackets)
+    elif endModel == 'F4_B':
+        brackets[:, :60] = FIXED_BITS_TABLE[getF4SeedsSplit(year, 4 * n, model)].reshape(n, 60)
+        brackets = fillByBinomialSeedWinsBatch(model, year, brackets)
+    elif endModel == 'NCG' or endModel == 'combined':
+        champion = getChampions(year, n, model)
+        runnerUp = getRunnerUps(year, n, model)
+        brackets[:, 60:63] = samplePatterns(all_patterns['NCG'][year], n)
+        brackets = fixBitsFromNCGBatch(brackets, champion, runnerUp)
+        brackets = fillByBinomialSeedWinsBatch(model, year, brackets)
+        if endModel == 'combined':
+            regions = brackets[:, :60].reshape(n, 4, 15)
+            f4Regions = FIXED_BITS_TABLE[getF4SeedsSplit(year, 4 * n, model)].reshape(n, 4, 15)
+            pending = regions[:, :, 14] == -1
+            regions[pending] = f4Regions[pending]
+            brackets[:, :60] = regions.reshape(n, 60)
+    else:
+        raise Exception('Not implemented yet')
+    return brackets
+
+
+# This function generates a 63-element array of 0s and 1s
+# to represent game outcomes in a bracket.
+def generateBracket(model, year):
+    if model.get('endModel') is None:
+        return genBracketsWithoutEndModel(model, year, 1)[0]
+    return fillEmptySpaces(getPartialBracket(model, year), model, year)
+
+
+# This function generates n brackets at once as an (n, 63) array. The
+# endModel bits of the whole pool are fixed together and then its
+# pending bits are filled together.
+def generateBrackets(model, year, n):
+    if model.get('endModel') is None:
+        return genBracketsWithoutEndModel(model, year, n)
+    return fillEmptySpaces(getPartialBrackets(model, year, n), model, year)
+
+
+# Brackets are generated and scored in chunks of CHUNK_SIZE brackets
+# so that large batches do not need the whole pool in memory.
+CHUNK_SIZE = 100000
+
+
 def performExperiments(numTrials, year, batchNumber, model):
     summarizer = RuntimeSummary(model)
     correctVector = getActualBracketVector(year)
 
-    scores = [None] * numTrials
-    scoreMethod = scoreFFFBracket if model.get('format') == 'FFF' else scoreBracket
+    experimentScores = ExperimentScores(model, correctVector, numTrials)
 
-    for n in range(numTrials):
-        newBracketVector = generateBracket(model, year)
-        assert np.all(newBracketVector != -1)
-        summarizer.analyze_bracket(newBracketVector)
-        newBracketScore = scoreMethod(newBracketVector, correctVector)
-        scores[n] = newBracketScore[0]
+    for start in range(0, numTrials, CHUNK_SIZE):
+        brackets = generateBrackets(model, year, min(CHUNK_SIZE, numTrials - start))
+        assert np.all(brackets != -1)
+        summarizer.analyze_batch(brackets)
+        experimentScores.addBatch(start, brackets)
 
-    bracketListDict = {'year': year, 'actualBracket': ''.join(str(bit) for bit in correctVector), 'scores': scores}
+    batchFolderName = batchFolder(numTrials, batchNumber)
 
-    if numTrials < 1000:
-        folderName = 'Experiments/{0}Trials'.format(numTrials)
-    else:
-        folderName = 'Experiments/{0}kTrials'.format(int(numTrials / 1000))
-    batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
-
-    outputFilename = '{2}/generatedScores_{0}_{1}.json'.format(model['modelName'], year, batchFolderName)
     summaryFilename = '{2}/vectorStats_{0}_{1}.json'.format(model['modelName'], year, batchFolderName)
-    with open(outputFilename, 'w') as outputFile:
-        outputFile.write(json.dumps(bracketListDict))
+    experimentScores.save(batchFolderName, model['modelName'], year)
     summarizer.to_json(summaryFilename)
+    return experimentScores.saveScores(batchFolderName, model['modelName'], year)
 
 
 ######################################################################
 # This script runs experiments with the given models,
 # number of trials, and number of batches for 2013 through 2018.
 ######################################################################
+numWorkers = int(popOption(sys.argv, 'workers', 1))
+masterSeed = popOption(sys.argv, 'seed')
+if masterSeed is not None:
+    masterSeed = int(masterSeed)
 
 # Load models
 if len(sys.argv) > 3:
@@ -968,38 +1055,7 @@ else:
 
 testRegionalBits()
 
-for modelId, modelDict in enumerate(modelsList):
-    if modelIndex != -1 and modelIndex != modelId:
-        continue
-    modelName = modelDict['modelName']
-
-    all_brackets = load_ref_brackets(modelDict.get('format', 'TTT'))
-    # calculate bitwise MLE probs
-    for year in range(2013, 2020):
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
-        probs[year] = np.mean(vectors, axis=0)
-
-    fill_all_pattern_probs()
-    fill_triplet_probs()
-    fill_path_probs()
-
-    print '{0:<8s}: {1}'.format(modelName, time.strftime("%Y-%m-%d %H:%M"))
-
-    for year in range(2013, 2020):
-        print '\t {0}: {1}'.format(year, time.strftime("%Y-%m-%d %H:%M"))
-        for batchNumber in range(numBatches):
-            print '\t\t {0}: {1}'.format(batchNumber, time.strftime("%Y-%m-%d %H:%M"))
-            if numTrials < 1000:
-                folderName = 'Experiments/{0}Trials'.format(numTrials)
-            else:
-                folderName = 'Experiments/{0}kTrials'.format(int(numTrials / 1000))
-
-            if not os.path.exists(folderName):
-                os.makedirs(folderName)
-
-            batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
-            if not os.path.exists(batchFolderName):
-                os.makedirs(batchFolderName)
-
-            performExperiments(numTrials, year, batchNumber, modelDict)
-
+models = [modelDict for modelId, modelDict in enumerate(modelsList)
+          if modelIndex == -1 or modelIndex == modelId]
+units = experimentUnits(models, range(2013, 2020), numBatches)
+runExperiments(performExperiments, numTrials, units, numWorkers, prepareModel, masterSeed=masterSeed)
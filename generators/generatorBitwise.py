@@ -6,8 +6,13 @@ import os.path
 import sys
 
 from scoringUtils import getActualBracketVector
-from scoringUtils import scoreFFFBracket, scoreBracket
+from experimentUtils import ExperimentScores
+from experimentRunner import batchFolder, experimentUnits
+from experimentRunner import popOption, runExperiments
+from patternTables import loadPatternTables
+from patternSampling import setPatterns
 from utils.runtimeSummary import RuntimeSummary
+from utils.historyCube import HistoryCube
 
 
 def load_ref_brackets(fmt='TTT'):
@@ -20,6 +25,8 @@ def load_ref_brackets(fmt='TTT'):
     return vectors
 
 probs = {}
+# cumulative counts of the historical brackets (see utils/historyCube.py)
+history = None
 all_triplets = {
     'E8_F4': {
         'bits': [12, 13, 14]
@@ -225,25 +232,22 @@ def fill_triplet_probs():
     global all_triplets
     names = list(all_triplets.keys())
     for year in range(2013, 2020):
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
-        vectors = vectors[:, :60].reshape(-1, 15)
         for name in names:
             triplet = all_triplets[name]['bits']
             if np.greater(triplet, 14).any():
                 continue
-            triplets, counts = np.unique(vectors[:, triplet], axis=0, return_counts=True)
+            triplets, counts = history.pattern_counts_before(triplet, year, pooled=True)
             cdf = [1. * counts[:i].sum() / counts.sum()
                    for i in range(len(counts) + 1)]
             all_triplets[name][year] = {
                 'p': cdf,
                 'triplets': triplets
             }
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
         for name in names:
             triplet = all_triplets[name]['bits']
             if np.greater(14, triplet).all():
                 continue
-            triplets, counts = np.unique(vectors[:, triplet], axis=0, return_counts=True)
+            triplets, counts = history.pattern_counts_before(triplet, year)
             cdf = [1. * counts[:i].sum() / counts.sum()
                    for i in range(len(counts) + 1)]
             all_triplets[name][year] = {
@@ -256,25 +260,22 @@ def fill_path_probs():
     global all_paths
     names = list(all_paths.keys())
     for year in range(2013, 2020):
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
-        vectors = vectors[:, :60].reshape(-1, 15)
         for name in names:
             triplet = all_paths[name]['bits']
             if np.greater(triplet, 14).any():
                 continue
-            triplets, counts = np.unique(vectors[:, triplet], axis=0, return_counts=True)
+            triplets, counts = history.pattern_counts_before(triplet, year, pooled=True)
             cdf = [1. * counts[:i].sum() / counts.sum()
                    for i in range(len(counts) + 1)]
             all_paths[name][year] = {
                 'p': cdf,
                 'triplets': triplets
             }
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
         for name in names:
             triplet = all_paths[name]['bits']
             if np.greater(14, triplet).all():
                 continue
-            triplets, counts = np.unique(vectors[:, triplet], axis=0, return_counts=True)
+            triplets, counts = history.pattern_counts_before(triplet, year)
             cdf = [1. * counts[:i].sum() / counts.sum()
                    for i in range(len(counts) + 1)]
             all_paths[name][year] = {
@@ -283,91 +284,125 @@ def fill_path_probs():
             }
 
 
-def getP(model, year, bit_id):
-    if model.get('annealing_model') is not None and bit_id < 60 and (bit_id % 15) < 8:
-        return perturbed_ps[model.get('annealing_model')][bit_id % 15]
-    base_p = probs[year][bit_id]
-    if model.get('perturbation'):
-        if model.get('perturbationType') == 'fixed':
-            p = base_p + np.random.uniform(-model['perturbation'], model['perturbation'])
-        else:
-            p = np.random.uniform((1 - model['perturbation']) * base_p, (1 + model['perturbation']) * base_p)
+# Fills the pattern tables of the format, computing them only if
+# they are not cached on disk yet (see patternTables.py).
+def load_pattern_tables(fmt):
+    def compute():
+        fill_triplet_probs()
+        fill_path_probs()
+    groups = {'all_triplets': all_triplets, 'all_paths': all_paths}
+    loadPatternTables(fmt, all_brackets, groups, None, compute)
+
+
+# The probabilities and pattern tables only depend on the format, so
+# they are only loaded again when a model uses another format.
+tablesFormat = None
+
+
+def prepareModel(modelDict):
+    global all_brackets, history, tablesFormat
+    fmt = modelDict.get('format', 'TTT')
+    if fmt != tablesFormat:
+        all_brackets = load_ref_brackets(fmt)
+        # calculate bitwise MLE probs
+        history = HistoryCube(all_brackets, fmt)
+        for year in range(2013, 2020):
+            probs[year] = history.bit_probs_before(year)
+
+        load_pattern_tables(fmt)
+        tablesFormat = fmt
+
+
+# This function returns the probability that every bit is 1 as a
+# 63-element array, i.e., the MLE of every bit where the annealed
+# Round 1 probabilities replace the ones of Round 1.
+def getProbabilityVector(model, year):
+    p = np.array(probs[year], dtype=float)
+    if model.get('annealing_model') is not None:
+        annealed = perturbed_ps[model.get('annealing_model')]
+        for bit_id in range(60):
+            if (bit_id % 15) < 8:
+                p[bit_id] = annealed[bit_id % 15]
+    return p
+
+
+# This function returns the probabilities of n brackets, an (n, 63)
+# array when the model is perturbed (every bracket draws its own
+# perturbation of every bit) or the 63-element vector otherwise.
+def getProbabilities(model, year, n):
+    p = getProbabilityVector(model, year)
+    if not model.get('perturbation'):
+        return p
+    if model.get('perturbationType') == 'fixed':
+        perturbed = p + np.random.uniform(-model['perturbation'], model['perturbation'], (n, 63))
     else:
-        p = base_p
-    return np.clip(p, 0., 1.)
+        perturbed = np.random.uniform((1 - model['perturbation']) * p, (1 + model['perturbation']) * p, (n, 63))
+    if model.get('annealing_model') is not None:
+        isAnnealed = (np.arange(63) < 60) & (np.arange(63) % 15 < 8)
+        perturbed[:, isAnnealed] = p[isAnnealed]
+    return np.clip(perturbed, 0., 1.)
+
+
+# This function generates n brackets at once as an (n, 63) array by
+# comparing an (n, 63) matrix of uniform numbers to the probabilities
+# of the bits. The triplets and paths of the model then overwrite
+# their bits, in all regions of all brackets at once.
+def generateBrackets(model, year, n):
+    if model.get('endModel') is not None:
+        raise Exception('Not implemented yet')
+    brackets = (np.random.rand(n, 63) < getProbabilities(model, year, n)).astype(np.uint8)
+    regionOffsets = 15 * np.arange(4)[:, np.newaxis]
+    for t in model.get('triplets', []):
+        setPatterns(brackets, regionOffsets + np.array(all_triplets[t]['bits']), all_triplets[t][year])
+
+    for t in model.get('paths', []):
+        setPatterns(brackets, regionOffsets + np.array(all_paths[t]['bits']), all_paths[t][year])
+
+    # non-regional patterns
+    for t in model.get('non-regional-triplets', []):
+        setPatterns(brackets, np.array(all_triplets[t]['bits']), all_triplets[t][year])
+
+    for t in model.get('non-regional-paths', []):
+        setPatterns(brackets, np.array(all_paths[t]['bits']), all_paths[t][year])
+    return brackets
 
 
 def generateBracket(model, year):
-    if model.get('endModel') is None:
-        n = np.random.rand(63)
-        p = [getP(model, year, i) for i in range(63)]
-        bracket = (n < p).astype(int)
-        for region in range(4):
-            for t in model.get('triplets', []):
-                n = np.random.rand()
-                for i in range(8):
-                    if n > all_triplets[t][year]['p'][i] and n < all_triplets[t][year]['p'][i+1]:
-                        bracket[15 * region + np.array(all_triplets[t]['bits'])]= all_triplets[t][year]['triplets'][i]
-                        break
-
-            for t in model.get('paths', []):
-                n = np.random.rand()
-                for i in range(8):
-                    if n > all_paths[t][year]['p'][i] and n < all_paths[t][year]['p'][i + 1]:
-                        bracket[15 * region + np.array(all_paths[t]['bits'])] = all_paths[t][year]['triplets'][i]
-                        break
-
-        # non-regional patterns
-        for t in model.get('non-regional-triplets', []):
-            n = np.random.rand()
-            for i in range(8):
-                if n > all_triplets[t][year]['p'][i] and n < all_triplets[t][year]['p'][i + 1]:
-                    bracket[np.array(all_triplets[t]['bits'])] = all_triplets[t][year]['triplets'][i]
-                    break
-
-        for t in model.get('non-regional-paths', []):
-            n = np.random.rand()
-            for i in range(8):
-                if n > all_paths[t][year]['p'][i] and n < all_paths[t][year]['p'][i + 1]:
-                    bracket[np.array(all_paths[t]['bits'])] = all_paths[t][year]['triplets'][i]
-                    break
-        return bracket
-    else:
-        raise Exception('Not implemented yet')
+    return generateBrackets(model, year, 1)[0]
+
+
+# Brackets are generated and scored in chunks of CHUNK_SIZE brackets
+# so that large batches do not need the whole pool in memory.
+CHUNK_SIZE = 100000
 
 
 def performExperiments(numTrials, year, batchNumber, model):
     summarizer = RuntimeSummary(model)
     correctVector = getActualBracketVector(year)
 
-    scores = [None] * numTrials
-    scoreMethod = scoreFFFBracket if model.get('format') == 'FFF' else scoreBracket
+    experimentScores = ExperimentScores(model, correctVector, numTrials)
 
-    for n in range(numTrials):
-        newBracketVector = generateBracket(model, year)
-        summarizer.analyze_bracket(newBracketVector)
-        newBracketScore = scoreMethod(newBracketVector, correctVector)
-        scores[n] = newBracketScore[0]
+    for start in range(0, numTrials, CHUNK_SIZE):
+        brackets = generateBrackets(model, year, min(CHUNK_SIZE, numTrials - start))
+        summarizer.analyze_batch(brackets)
+        experimentScores.addBatch(start, brackets)
 
-    bracketListDict = {'year': year, 'actualBracket': ''.join(str(bit) for bit in correctVector), 'scores': scores}
-
-    if numTrials < 1000:
-        folderName = 'Experiments/{0}Trials'.format(numTrials)
-    else:
-        folderName = 'Experiments/{0}kTrials'.format(int(numTrials / 1000))
-    batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
+    batchFolderName = batchFolder(numTrials, batchNumber)
 
-    outputFilename = '{2}/generatedScores_{0}_{1}.json'.format(model['modelName'], year, batchFolderName)
     summaryFilename = '{2}/vectorStats_{0}_{1}.json'.format(model['modelName'], year, batchFolderName)
-    with open(outputFilename, 'w') as outputFile:
-        outputFile.write(json.dumps(bracketListDict))
+    experimentScores.save(batchFolderName, model['modelName'], year)
     summarizer.to_json(summaryFilename)
+    return experimentScores.saveScores(batchFolderName, model['modelName'], year)
 
 
 ######################################################################
 # This script runs experiments with the given models,
 # number of trials, and number of batches for 2013 through 2018.
 ######################################################################
+numWorkers = int(popOption(sys.argv, 'workers', 1))
+masterSeed = popOption(sys.argv, 'seed')
+if masterSeed is not None:
+    masterSeed = int(masterSeed)
 
 # Load models
 if len(sys.argv) > 3:
@@ -388,37 +423,7 @@ if len(sys.argv) == 5:
 else:
     modelIndex = -1
 
-for modelId, modelDict in enumerate(modelsList):
-    if modelIndex != -1 and modelIndex != modelId:
-        continue
-    modelName = modelDict['modelName']
-
-    all_brackets = load_ref_brackets(modelDict.get('format', 'TTT'))
-    # calculate bitwise MLE probs
-    for year in range(2013, 2020):
-        vectors = np.vstack([v for y, v in all_brackets.items() if y < year])
-        probs[year] = np.mean(vectors, axis=0)
-
-    fill_triplet_probs()
-    fill_path_probs()
-
-    print '{0:<8s}: {1}'.format(modelName, time.strftime("%Y-%m-%d %H:%M"))
-
-    for year in range(2013, 2020):
-        print '\t {0}: {1}'.format(year, time.strftime("%Y-%m-%d %H:%M"))
-        for batchNumber in range(numBatches):
-            print '\t\t {0}: {1}'.format(batchNumber, time.strftime("%Y-%m-%d %H:%M"))
-            if numTrials < 1000:
-                folderName = 'Experiments/{0}Trials'.format(numTrials)
-            else:
-                folderName = 'Experiments/{0}kTrials'.format(int(numTrials / 1000))
-
-            if not os.path.exists(folderName):
-                os.makedirs(folderName)
-
-            batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
-            if not os.path.exists(batchFolderName):
-                os.makedirs(batchFolderName)
-
-            performExperiments(numTrials, year, batchNumber, modelDict)
-
+models = [modelDict for modelId, modelDict in enumerate(modelsList)
+          if modelIndex == -1 or modelIndex == modelId]
+units = experimentUnits(models, range(2013, 2020), numBatches)
+runExperiments(performExperiments, numTrials, units, numWorkers, prepareModel, masterSeed=masterSeed)
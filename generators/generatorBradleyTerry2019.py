@@ -9,12 +9,14 @@ import sys
 from math import log, ceil, floor
 
 from collections import defaultdict
-from samplingUtils import getE8SeedBottom, getE8SeedTop
-from samplingUtils import getF4SeedSplit, getF4SeedTogether
-from samplingUtils import getChampion, getRunnerUp
+from matchupProbabilities import getMatchupTensor, powerMatchupTensor
+from matchupProbabilities import pairwiseMatchupTensor, setRound1Probabilities
+from simulationEngine import simulateBracket, simulateBrackets
 
 from scoringUtils import getActualBracketVector
-from scoringUtils import scoreBracket
+from scoringUtils import ReferenceScorer
+from experimentRunner import batchFolder, experimentUnits
+from experimentRunner import popOption, runExperiments
 
 
 ######################################################################
@@ -92,154 +94,32 @@ annealing_probs_normal = {k: np.array(omega)
                           for k, omega in annealing_probs_normal.items()}
 
 
-# Returns the estimated probability that s1 beats s2
-def getP(s1, s2, model, year, roundNum):
-    if model.get('annealing_model') is not None and roundNum == 1:
-        return annealing_probs_normal[model.get('annealing_model')][min(s1, s2)]
+# Compiles the model into its matchup probability tensor, filled
+# either from the Bradley-Terry probabilities or the power model.
+# The annealed Round 1 probabilities replace the ones of Round 1.
+def compileModel(model, year):
     if model.get('bradleyTerry'):
-        if s1 == s2:
-            return 0.5
-        return BT_probs[year][(s1, s2)]
-    alpha = getAlpha(s1, s2, model, year, roundNum)
-    s1a = (s1 * 1.0) ** alpha
-    s2a = (s2 * 1.0) ** alpha
-    return s2a / (s1a + s2a)
+        P = pairwiseMatchupTensor(BT_probs[year])
+    else:
+        P = powerMatchupTensor(getAlpha, model, year)
+    if model.get('annealing_model') is not None:
+        setRound1Probabilities(P, annealing_probs_normal[model.get('annealing_model')])
+    return P
 
 
 # This function generates a 63-element list of 0s and 1s
 # to represent game outcomes in a bracket. The model specifies
 # which alpha value(s) to use for each round.
 def generateBracket(model, year):
-    bracket = []
-
-    random.seed()
-
-    endModel = 'None'
-    if 'endModel' in model:
-        endModel = model['endModel']
-
-    e8Seeds = []
-    if endModel == 'E8':
-        for i in range(4):
-            e8Seeds.append(getE8SeedTop(year))
-            e8Seeds.append(getE8SeedBottom(year))
-    else:
-        e8Seeds = [-1, -1, -1, -1, -1, -1, -1, -1]
-
-    f4Seeds = []
-    if endModel == 'F4_1':
-        for i in range(4):
-            f4Seeds.append(getF4SeedTogether(year))
-    elif endModel == 'F4_2':
-        for i in range(4):
-            f4Seeds.append(getF4SeedSplit(year))
-    else:
-        f4Seeds = [-1, -1, -1, -1]
-
-    ncgSeeds = [-1, -1]
-    if 'Rev' in endModel:
-        champion = getChampion(year)
-        runnerUp = getRunnerUp(year)
-        champRegion = int(floor(random.random() * 4))
-        champHalf = champRegion / 2
-        ruRegion = int(floor(random.random() * 2))
-
-        if champHalf == 0:
-            ncgSeeds = [champion, runnerUp]
-        else:
-            ncgSeeds = [runnerUp, champion]
-
-        ffrRegion = 1 - ruRegion
-
-        if champRegion < 2:
-            ruRegion += 2
-            ffrRegion += 2
-            ffcRegion = 1 - champRegion
-        else:
-            ffcRegion = 5 - champRegion
-
-        f4Seeds[champRegion] = champion
-        f4Seeds[ruRegion] = runnerUp
-
-    if endModel == 'Rev_4':
-        f4Seeds[ffcRegion] = getF4SeedTogether(year)
-        f4Seeds[ffrRegion] = getF4SeedTogether(year)
-
-    # Loop through regional rounds R64, R32, and S16
-    for region in range(4):
-        seeds = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-        for roundNum in range(1, 5):
-            numGames = int(len(seeds) / 2)
-            newSeeds = []
-            for gameNum in range(numGames):
-                s1 = seeds[2 * gameNum]
-                s2 = seeds[2 * gameNum + 1]
-
-                # Force any fixed F4/E8 seeds to make it through
-                s1Wins = (s1 == f4Seeds[region]) or ((roundNum < 4) and (
-                        (s1 == e8Seeds[2 * region]) or (
-                        s1 == e8Seeds[2 * region + 1])))
-                s2Wins = (s2 == f4Seeds[region]) or ((roundNum < 4) and (
-                        (s2 == e8Seeds[2 * region]) or (
-                        s2 == e8Seeds[2 * region + 1])))
-
-                if s1Wins:
-                    p = 1
-                elif s2Wins:
-                    p = 0
-                else:
-                    p = getP(s1, s2, model, year, roundNum)
-
-                if random.random() <= p:
-                    bracket.append(1)
-                    newSeeds.append(s1)
-                else:
-                    bracket.append(0)
-                    newSeeds.append(s2)
-            seeds = newSeeds
-        f4Seeds[region] = seeds[0]
-
-    # Round 5:
-    for gameNum in range(2):
-        s1 = f4Seeds[2 * gameNum]
-        s2 = f4Seeds[2 * gameNum + 1]
-
-        if 'Rev' in endModel:
-            if (2 * gameNum == champRegion) or (2 * gameNum == ruRegion):
-                p = 1
-            elif (2 * gameNum + 1 == champRegion) or (
-                    2 * gameNum + 1 == ruRegion):
-                p = 0
-            else:
-                p = getP(s1, s2, model, year, 5)
-        else:
-            p = getP(s1, s2, model, year, 5)
-
-        if random.random() <= p:
-            bracket.append(1)
-            ncgSeeds[gameNum] = s1
-        else:
-            bracket.append(0)
-            ncgSeeds[gameNum] = s2
+    P = getMatchupTensor(compileModel, model, year)
+    return simulateBracket(P, model, year, perturbed=False)
 
-    # Round 6:
-    s1 = ncgSeeds[0]
-    s2 = ncgSeeds[1]
 
-    if 'Rev' in endModel:
-        if champHalf == 0:
-            p = 1
-        else:
-            p = 0
-    else:
-        p = getP(s1, s2, model, year, 6)
-
-    if random.random() <= p:
-        bracket.append(1)
-    else:
-        bracket.append(0)
-
-    return bracket
+# This function generates n brackets at once as an (n, 63) array
+# (or as packed brackets), see simulationEngine.simulateBrackets.
+def generateBrackets(model, year, n, packed=False):
+    P = getMatchupTensor(compileModel, model, year)
+    return simulateBrackets(P, model, year, n, packed, perturbed=False)
 
 
 # This function returns the alpha value to use for
@@ -373,10 +253,13 @@ def getAlpha(s1, s2, model, year, roundNum):
 def performExperiments(numTrials, year, batchNumber, model):
     correctVector = getActualBracketVector(year)
 
+    newBrackets = generateBrackets(model, year, numTrials)
+    newBracketScores = ReferenceScorer(correctVector).score(newBrackets).tolist()
+
     brackets = []
     for n in range(numTrials):
-        newBracketVector = generateBracket(model, year)
-        newBracketScore = scoreBracket(newBracketVector, correctVector)
+        newBracketVector = newBrackets[n]
+        newBracketScore = newBracketScores[n]
         # numCorrectPicks = calcCorrectPicks(newBracketScore)
 
         newBracketString = ''.join(str(bit) for bit in newBracketVector)
@@ -388,11 +271,7 @@ def performExperiments(numTrials, year, batchNumber, model):
     bracketListDict = {'year': year, 'actualBracket': ''.join(
         str(bit) for bit in correctVector), 'brackets': brackets}
 
-    if numTrials < 1000:
-        folderName = 'Experiments/{0}Trials'.format(numTrials)
-    else:
-        folderName = 'Experiments/{0}kTrials'.format(int(numTrials / 1000))
-    batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
+    batchFolderName = batchFolder(numTrials, batchNumber)
 
     outputFilename = '{2}/generatedBrackets_{0}_{1}.json'.format(
         model['modelName'], year, batchFolderName)
@@ -405,6 +284,10 @@ def performExperiments(numTrials, year, batchNumber, model):
 # number of trials, and number of batches for 2013 through 2018.
 ######################################################################
 load_BT_probs()
+numWorkers = int(popOption(sys.argv, 'workers', 1))
+masterSeed = popOption(sys.argv, 'seed')
+if masterSeed is not None:
+    masterSeed = int(masterSeed)
 
 # Load models
 if len(sys.argv) > 3:
@@ -425,26 +308,8 @@ numBatches = int(sys.argv[2])
 # pr = cProfile.Profile()
 # pr.enable()
 
-for modelDict in modelsList:
-    modelName = modelDict['modelName']
-
-    print '{0:<8s}: {1}'.format(modelName, time.strftime("%Y-%m-%d %H:%M"))
-
-    for batchNumber in range(numBatches):
-        if numTrials < 1000:
-            folderName = 'Experiments/{0}Trials'.format(numTrials)
-        else:
-            folderName = 'Experiments/{0}kTrials'.format(int(numTrials / 1000))
-
-        if not os.path.exists(folderName):
-            os.makedirs(folderName)
-
-        batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
-        if not os.path.exists(batchFolderName):
-            os.makedirs(batchFolderName)
-
-        for year in range(2013, 2020):
-            performExperiments(numTrials, year, batchNumber, modelDict)
+units = experimentUnits(modelsList, range(2013, 2020), numBatches)
+runExperiments(performExperiments, numTrials, units, numWorkers, masterSeed=masterSeed)
 
 #
 # pr.disable()
@@ -5,16 +5,14 @@ import numpy as np
 import os.path
 import random
 import sys
-from math import log, ceil, floor
 
-from samplingUtils import getTruncGeom
-from samplingUtils import getE8SeedBottom, getE8SeedTop
-from samplingUtils import getF4SeedSplit, getF4SeedTogether
-from samplingUtils import getChampion, getRunnerUp
-
-from scoringUtils import applyRoundResults
+from matchupProbabilities import getMatchupTensor, powerMatchupTensor
+from matchupProbabilities import setRound1Probabilities
 from scoringUtils import getActualBracketVector
-from scoringUtils import scoreBracket
+from experimentUtils import ExperimentScores
+from experimentRunner import batchFolder, experimentUnits
+from experimentRunner import popOption, runExperiments
+from simulationEngine import simulateBracket, simulateBrackets
 from utils.runtimeSummary import RuntimeSummary
 
 ######################################################################
@@ -260,179 +258,32 @@ for key in perturbed_ps.keys():
     newone[key] = [None] + sorted_p.tolist()
 perturbed_ps = newone
 
-# Returns the estimated probability that s1 beats s2
-def getP(s1, s2, model, year, roundNum):
-    if model.get('annealing_model') is not None and roundNum == 1:
-        return perturbed_ps[model.get('annealing_model')][min(s1, s2)]
-    alpha = getAlpha(s1, s2, model, year, roundNum)
-    s1a = (s1 * 1.0) ** alpha
-    s2a = (s2 * 1.0) ** alpha
-    return s2a / (s1a + s2a)
-
-
-TOP_SEEDS = [1, 16, 8, 9, 5, 12, 4, 13]
-BOTTOM_SEEDS = [6, 11, 3, 14, 7, 10, 2, 15]
+# Compiles the model into its matchup probability tensor, where
+# the annealed Round 1 probabilities replace the power model ones.
+def compileModel(model, year):
+    P = powerMatchupTensor(getAlpha, model, year)
+    if model.get('annealing_model') is not None:
+        setRound1Probabilities(P, perturbed_ps[model.get('annealing_model')])
+    return P
 
 
 # This function generates a 63-element list of 0s and 1s
 # to represent game outcomes in a bracket. The model specifies
 # which alpha value(s) to use for each round.
 def generateBracket(model, year):
-    pooled = model.get('pooled', False)
-    generator = model.get('generator', None)
-    fmt = model.get('format', 'TTT')
-    override_f4 = model.get('overrideF4', 'TTT')
-
-    bracket = []
-
-    # random.seed()
-
-    endModel = 'None'
-    if 'endModel' in model:
-        endModel = model['endModel']
-
-    NCG_E8 = 'NCG_E8'
-    e8Seeds = []
-    if endModel == 'E8' or endModel == NCG_E8:
-        for i in range(4):
-            e8Seeds.append(getE8SeedTop(year, model))
-            e8Seeds.append(getE8SeedBottom(year, model))
-    else:
-        e8Seeds = [-1, -1, -1, -1, -1, -1, -1, -1]
-
-    f4Seeds = []
-    if endModel == 'F4_1':
-        for i in range(4):
-            seed = getF4SeedTogether(year, model)
-            f4Seeds.append(seed)
-            if endModel == NCG_E8:
-                if seed in TOP_SEEDS:
-                    e8Seeds[i * 2] = seed
-                else:
-                    e8Seeds[i * 2 + 1] = seed
-    elif endModel == 'F4_2':
-        for i in range(4):
-            f4Seeds.append(getF4SeedSplit(year, model))
-    else:
-        f4Seeds = [-1, -1, -1, -1]
-
-    ncgSeeds = [-1, -1]
-    if 'Rev' in endModel or endModel == NCG_E8:
-        champion = getChampion(year, model)
-        runnerUp = getRunnerUp(year, model)
-        champRegion = int(floor(random.random() * 4))
-        champHalf = champRegion / 2
-        ruRegion = int(floor(random.random() * 2))
-
-        if champHalf == 0:
-            ncgSeeds = [champion, runnerUp]
-        else:
-            ncgSeeds = [runnerUp, champion]
-
-        ffrRegion = 1 - ruRegion
-
-        if champRegion < 2:
-            ruRegion += 2
-            ffrRegion += 2
-            ffcRegion = 1 - champRegion
-        else:
-            ffcRegion = 5 - champRegion
-
-        f4Seeds[champRegion] = champion
-        f4Seeds[ruRegion] = runnerUp
-
-        if endModel == NCG_E8:
-            if champion in TOP_SEEDS:
-                e8Seeds[champRegion * 2] = champion
-            else:
-                e8Seeds[champRegion * 2 + 1] = champion
-            if runnerUp in TOP_SEEDS:
-                e8Seeds[ruRegion * 2] = runnerUp
-            else:
-                e8Seeds[ruRegion * 2 + 1] = runnerUp
-
-    else:
-        champRegion = -1
-        ruRegion = -1
-
-    if endModel == 'Rev_4':
-        f4Seeds[ffcRegion] = getF4SeedTogether(year, model)
-        f4Seeds[ffrRegion] = getF4SeedTogether(year, model)
-
-    if not generator:
-        # Loop through regional rounds R64, R32, and S16
-        for region in range(4):
-            seeds = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-            for roundNum in range(1, 5):
-                numGames = int(len(seeds) / 2)
-                newSeeds = []
-                for gameNum in range(numGames):
-                    s1 = seeds[2 * gameNum]
-                    s2 = seeds[2 * gameNum + 1]
-
-                    # Force any fixed F4/E8 seeds to make it through
-                    s1Wins = (s1 == f4Seeds[region]) or ((roundNum < 4) and ((s1 == e8Seeds[2*region]) or (s1 == e8Seeds[2*region + 1])))
-                    s2Wins = (s2 == f4Seeds[region]) or ((roundNum < 4) and ((s2 == e8Seeds[2*region]) or (s2 == e8Seeds[2*region + 1])))
-
-                    if s1Wins:
-                        p = 1
-                    elif s2Wins:
-                        p = 0
-                    else:
-                        p = getP(s1, s2, model, year, roundNum)
-
-                    if random.random() <= p:
-                        bracket.append(1 if fmt == 'TTT' else (1 if s1 < s2 else 0))
-                        newSeeds.append(s1)
-                    else:
-                        bracket.append(0 if fmt == 'TTT' else (1 if s2 < s1 else 0))
-                        newSeeds.append(s2)
-                seeds = newSeeds
-            f4Seeds[region] = seeds[0]
-        bracket = bracket + [-1, -1, -1]
-
-    # Round 5:
-    for gameNum in range(2):
-        s1 = f4Seeds[2 * gameNum]
-        s2 = f4Seeds[2 * gameNum + 1]
-
-        if 'Rev' in endModel:
-            if (2 * gameNum == champRegion) or (2 * gameNum == ruRegion):
-                p = 1
-            elif (2 * gameNum + 1 == champRegion) or (2 * gameNum + 1 == ruRegion):
-                p = 0
-            else:
-                p = getP(s1, s2, model, year, 5)
-        else:
-            p = getP(s1, s2, model, year, 5)
-
-        if random.random() <= p:
-            bracket[60 + gameNum] = 1
-            ncgSeeds[gameNum] = s1
-        else:
-            bracket[60 + gameNum] = 0
-            ncgSeeds[gameNum] = s2
+    if model.get('generator', None):
+        raise Exception('Not implemented yet')
+    P = getMatchupTensor(compileModel, model, year)
+    return simulateBracket(P, model, year)
 
-    # Round 6:
-    s1 = ncgSeeds[0]
-    s2 = ncgSeeds[1]
-
-    if 'Rev' in endModel:
-        if champHalf == 0:
-            p = 1
-        else:
-            p = 0
-    else:
-        p = getP(s1, s2, model, year, 6)
-
-    if random.random() <= p:
-        bracket[-1] = 1
-    else:
-        bracket[-1] = 0
 
-    # assert len(bracket) == 63
-    # assert np.count_nonzero(np.array(bracket) == -1) == 0
-    return bracket
+# This function generates n brackets at once as an (n, 63) array
+# (or as packed brackets), see simulationEngine.simulateBrackets.
+def generateBrackets(model, year, n, packed=False):
+    if model.get('generator', None):
+        raise Exception('Not implemented yet')
+    P = getMatchupTensor(compileModel, model, year)
+    return simulateBrackets(P, model, year, n, packed)
 
 
 otherAlphas = {
@@ -569,37 +420,38 @@ def getAlpha(s1, s2, model, year, roundNum):
 # This function generates and scores brackets
 # for the given year using the given model.
 # It prints the results in JSON format.
+# Brackets are generated and scored in chunks of CHUNK_SIZE brackets
+# so that large batches do not need the whole pool in memory.
+CHUNK_SIZE = 100000
+
+
 def performExperiments(numTrials, year, batchNumber, model):
     summarizer = RuntimeSummary(model)
     correctVector = getActualBracketVector(year)
 
-    scores = [None] * numTrials
-    for n in range(numTrials):
-        newBracketVector = generateBracket(model, year)
-        summarizer.analyze_bracket(np.array(newBracketVector))
-        newBracketScore = scoreBracket(newBracketVector, correctVector)
-        # numCorrectPicks = calcCorrectPicks(newBracketScore)
-        scores[n] = newBracketScore[0]
+    experimentScores = ExperimentScores(model, correctVector, numTrials)
 
-    bracketListDict = {'year': year, 'actualBracket': ''.join(str(bit) for bit in correctVector), 'scores': scores}
+    for start in range(0, numTrials, CHUNK_SIZE):
+        brackets = generateBrackets(model, year, min(CHUNK_SIZE, numTrials - start))
+        summarizer.analyze_batch(brackets)
+        experimentScores.addBatch(start, brackets)
 
-    if numTrials < 1000:
-        folderName = 'Experiments/{0}Trials'.format(numTrials)
-    else:
-        folderName = 'Experiments/{0}kTrials'.format(int(numTrials / 1000))
-    batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
+    batchFolderName = batchFolder(numTrials, batchNumber)
 
-    outputFilename = '{2}/generatedScores_{0}_{1}.json'.format(model['modelName'], year, batchFolderName)
     summaryFilename = '{2}/vectorStats_{0}_{1}.json'.format(model['modelName'], year, batchFolderName)
-    with open(outputFilename, 'w') as outputFile:
-        outputFile.write(json.dumps(bracketListDict))
+    experimentScores.save(batchFolderName, model['modelName'], year)
     summarizer.to_json(summaryFilename)
+    return experimentScores.saveScores(batchFolderName, model['modelName'], year)
 
 
 ######################################################################
 # This script runs experiments with the given models,
 # number of trials, and number of batches for 2013 through 2018.
 ######################################################################
+numWorkers = int(popOption(sys.argv, 'workers', 1))
+masterSeed = popOption(sys.argv, 'seed')
+if masterSeed is not None:
+    masterSeed = int(masterSeed)
 
 # Load models
 modelFilename = sys.argv[3]
@@ -616,25 +468,5 @@ if len(sys.argv) == 5:
 else:
     years = range(2013, 2020)
 
-for modelDict in modelsList:
-    modelName = modelDict['modelName']
-
-    print '{0:<8s}: {1}'.format(modelName, time.strftime("%Y-%m-%d %H:%M"))
-
-    for year in years:
-        print '\t {0}: {1}'.format(year, time.strftime("%Y-%m-%d %H:%M"))
-        for batchNumber in range(numBatches):
-            print '\t\t {0}: {1}'.format(batchNumber, time.strftime("%Y-%m-%d %H:%M"))
-            if numTrials < 1000:
-                folderName = 'Experiments/{0}Trials'.format(numTrials)
-            else:
-                folderName = 'Experiments/{0}kTrials'.format(int(numTrials / 1000))
-
-            if not os.path.exists(folderName):
-                os.makedirs(folderName)
-
-            batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
-            if not os.path.exists(batchFolderName):
-                os.makedirs(batchFolderName)
-
-            performExperiments(numTrials, year, batchNumber, modelDict)
+units = experimentUnits(modelsList, years, numBatches)
+runExperiments(performExperiments, numTrials, units, numWorkers, masterSeed=masterSeed)
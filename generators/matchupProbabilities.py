@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+import json
+import numpy as np
+
+# Every seed-based generator estimates the probability that seed s1
+# beats seed s2 in a given round. For a fixed model and year these
+# probabilities are deterministic, so they are compiled once into a
+# dense 6x17x17 array P, where P[roundNum - 1, s1, s2] holds the
+# probability that s1 beats s2 in that round (seed 0 is unused).
+# The generators then index into P instead of recomputing the
+# probability of every game of every bracket.
+
+N_ROUNDS = 6
+N_SEEDS = 17
+
+# In Round 1 only the seeds s and 17 - s meet, the better seed on top
+ROUND1_MATCHUPS = [(s, 17 - s) for s in range(1, 9)]
+
+
+# This function fills the matchup tensor using a getP(s1, s2,
+# model, year, roundNum) function. In Round 1 getP is only evaluated
+# for the actual matchups (better seed first), the reverse entries
+# are their complements.
+def compileMatchupTensor(getP, model, year):
+    P = np.zeros((N_ROUNDS, N_SEEDS, N_SEEDS))
+    for s1, s2 in ROUND1_MATCHUPS:
+        P[0, s1, s2] = getP(s1, s2, model, year, 1)
+        P[0, s2, s1] = 1. - P[0, s1, s2]
+    for roundNum in range(2, N_ROUNDS + 1):
+        for s1 in range(1, N_SEEDS):
+            for s2 in range(1, N_SEEDS):
+                P[roundNum - 1, s1, s2] = getP(s1, s2, model, year, roundNum)
+    return P
+
+
+# This function fills the matchup tensor of a power model, where s1
+# beats s2 with probability s2^alpha / (s1^alpha + s2^alpha) and
+# getAlpha(s1, s2, model, year, roundNum) gives the alpha of the game.
+def powerMatchupTensor(getAlpha, model, year):
+    def getP(s1, s2, model, year, roundNum):
+        alpha = getAlpha(s1, s2, model, year, roundNum)
+        s1a = (s1 * 1.0) ** alpha
+        s2a = (s2 * 1.0) ** alpha
+        return s2a / (s1a + s2a)
+    return compileMatchupTensor(getP, model, year)
+
+
+# This function overrides the Round 1 probabilities with a list
+# indexed by the better seed of each matchup, e.g., the perturbed
+# probabilities found by simulated annealing.
+def setRound1Probabilities(P, probabilities):
+    for s1, s2 in ROUND1_MATCHUPS:
+        P[0, s1, s2] = probabilities[s1]
+        P[0, s2, s1] = 1. - probabilities[s1]
+    return P
+
+
+# This function builds a matchup tensor from a table of pairwise
+# probabilities such as the Bradley-Terry ones, i.e., a dictionary
+# (s1, s2) -> probability that s1 beats s2 used in every round.
+# Two teams with the same seed are equally likely to win.
+def pairwiseMatchupTensor(pairProbabilities):
+    P = np.zeros((N_ROUNDS, N_SEEDS, N_SEEDS))
+    for s1 in range(1, N_SEEDS):
+        for s2 in range(1, N_SEEDS):
+            P[:, s1, s2] = 0.5 if s1 == s2 else pairProbabilities[(s1, s2)]
+    return P
+
+
+compiledTensors = {}
+
+
+# This function returns the matchup tensor of the given model and
+# year, compiling it with compileModel(model, year) the first time.
+def getMatchupTensor(compileModel, model, year):
+    key = (compileModel, json.dumps(model, sort_keys=True), year)
+    if key not in compiledTensors:
+        compiledTensors[key] = compileModel(model, year)
+    return compiledTensors[key]
@@ -8,9 +8,13 @@ __status__ = "Development"
 import json
 import numpy as np
 import sys
+import time
 
 from collections import defaultdict
+from utils.experimentCatalog import open_catalog
 from utils.extractScores import extract_scores
+from utils.poolStats import histogram_metrics, score_histogram
+from utils.scoreStore import load_scores, save_scores, scores_basename
 
 
 def sample(n, scores):
@@ -24,9 +28,8 @@ def sample(n, scores):
 
 
 def read_scores(path):
-    with open(path) as f:
-        data = json.load(f)
-        return data['scores'], data['actualBracket']
+    scores, meta = load_scores(path)
+    return scores, meta['actualBracket']
 
 
 if __name__ == '__main__':
@@ -46,6 +49,7 @@ if __name__ == '__main__':
     numBatches = int(sys.argv[2])
 
     out = modelFilename.split('/')[-1].replace('.json', '')
+    catalog = open_catalog()
 
     for year in range(2013, 2020):
         for batchNumber in range(numBatches):
@@ -57,16 +61,22 @@ if __name__ == '__main__':
             batchFolderName = '{0}/Batch{1:02d}'.format(folderName,
                                                         batchNumber)
 
+            start = time.time()
             models_scores = []
             actual_bracket = None
             for modelDict in modelsList:
                 modelName = modelDict['modelName']
-                scoresFilepath = '{2}/generatedScores_{0}_{1}.json'.format(
-                    modelName, year, batchFolderName)
-                scores, actual_bracket = read_scores(scoresFilepath)
+                entry = catalog.find(modelName, numTrials, year, batchNumber)
+                if entry is None or entry['path'] is None or entry['format'] == 'hist':
+                    raise Exception('The scores of {} for {} (batch {}) were not saved'.format(
+                        modelName, year, batchNumber))
+                scores, actual_bracket = read_scores(entry['path'])
                 models_scores.append(scores)
 
             result = sample(numTrials, models_scores)
-            outputFilepath = '{2}/generatedScores_{0}Ensemble_{1}.json'.format(out, year, batchFolderName)
-            with open(outputFilepath, 'w') as f:
-                json.dump({'scores': result.tolist(), 'actualBracket': actual_bracket}, f)
+            outputFilepath = scores_basename(batchFolderName, out + 'Ensemble', year)
+            save_scores(outputFilepath, result, year, actual_bracket)
+            catalog.record(out + 'Ensemble', numTrials, year, batchNumber, config=modelsList,
+                           path=outputFilepath, fmt='npy', runtime=time.time() - start,
+                           metrics=histogram_metrics(score_histogram(result)))
+    catalog.close()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+import numpy as np
+
+# The pattern-based generators (Binomial, Conditional, Bitwise) sample
+# the values of small groups of bits (triplets and paths) from their
+# empirical distribution. Each pattern table holds 'triplets', the
+# distinct values of the group, and 'p', the CDF of their counts, i.e.,
+# p[0] = 0, p[-1] = 1 and triplets[i] has probability p[i + 1] - p[i].
+# These functions sample from the tables for a whole pool of brackets
+# at once with a binary search over the CDF.
+
+
+# This function returns, for every uniform number u, the index i of
+# the interval p[i] <= u < p[i + 1] of the CDF. Every u in [0, 1)
+# falls in exactly one interval, so boundary values are never lost.
+def sampleIndices(cdf, u):
+    cdf = np.asarray(cdf)
+    indices = np.searchsorted(cdf, u, side='right') - 1
+    return np.clip(indices, 0, len(cdf) - 2)
+
+
+# This function samples one value of the pattern (or n values as an
+# (n, bits) array) from its table.
+def samplePatterns(table, n=None):
+    u = np.random.rand() if n is None else np.random.rand(n)
+    return np.asarray(table['triplets'])[sampleIndices(table['p'], u)]
+
+
+# This function overwrites the bits given by selector in every
+# bracket of the (N, 63) pool with values sampled from the table.
+# The selector may also be a (regions, bits) array, in which case
+# every region of every bracket gets its own sample.
+def setPatterns(brackets, selector, table):
+    selector = np.asarray(selector)
+    nSamples = brackets.shape[0] * (selector.size // selector.shape[-1])
+    values = samplePatterns(table, nSamples)
+    brackets[:, selector] = values.reshape((brackets.shape[0],) + selector.shape)
+    return brackets
+
+
+# This function fills the bits given by selector in a pool of partial
+# brackets, where -1 marks the bits that are still pending. Brackets
+# with all of the bits pending get values sampled from the table,
+# brackets where only some of them are pending get values sampled from
+# the conditional table of the known bits, getConditional(key), where
+# key is a tuple of (position, value) pairs of the known bits. The
+# brackets are grouped by key so every conditional table is sampled
+# once for all of its brackets.
+def fillPatterns(brackets, selector, table, getConditional):
+    selector = np.asarray(selector)
+    values = brackets[:, selector]
+    known = values != -1
+    nKnown = known.sum(axis=1)
+
+    empty = np.flatnonzero(nKnown == 0)
+    if empty.size > 0:
+        brackets[np.ix_(empty, selector)] = samplePatterns(table, empty.size)
+
+    partial = (nKnown > 0) & (nKnown < selector.size)
+    if not partial.any():
+        return brackets
+    weights = 3 ** np.arange(selector.size)
+    keys = (values + 1).dot(weights)
+    for code in np.unique(keys[partial]):
+        rows = np.flatnonzero(partial & (keys == code))
+        bits = np.flatnonzero(known[rows[0]])
+        pending = np.flatnonzero(~known[rows[0]])
+        key = tuple(zip(bits, values[rows[0], bits]))
+        brackets[np.ix_(rows, selector[pending])] = samplePatterns(getConditional(key), rows.size)
+    return brackets
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+import hashlib
+import json
+import numpy as np
+import os.path
+import shutil
+
+# The triplet, path and conditional tables used by the pattern-based
+# generators (see patternSampling.py) only depend on the historical
+# brackets of the data format and on the bits of every pattern, but
+# computing them takes a while. These functions store the tables of a
+# (format, data hash) pair in a directory under CACHE_DIR, as a flat
+# array with all the CDFs, a flat int8 array with all the pattern
+# values and a JSON index. Later runs memory-map both arrays and
+# rebuild the dictionaries with views into them.
+
+CACHE_DIR = 'cache'
+
+# Version of the layout of the cached tables and of the way they are
+# computed. It is part of the hash, so bumping it rebuilds every cache.
+TABLES_VERSION = 1
+
+
+# This function returns a hash of the tables version, the historical
+# brackets and the bits of every pattern, so the cache is rebuilt
+# whenever any of them changes.
+def dataHash(all_brackets, groups):
+    digest = hashlib.sha1()
+    digest.update('version {0}'.format(TABLES_VERSION).encode())
+    for year in sorted(all_brackets.keys()):
+        digest.update(str(year).encode())
+        digest.update(np.asarray(all_brackets[year], dtype=np.int8).tobytes())
+    for groupName in sorted(groups.keys()):
+        for name in sorted(groups[groupName].keys()):
+            bits = [int(bit) for bit in groups[groupName][name]['bits']]
+            digest.update(json.dumps([groupName, name, bits]).encode())
+    return digest.hexdigest()[:16]
+
+
+def cachePath(fmt, all_brackets, groups):
+    return os.path.join(CACHE_DIR, 'patternTables_{0}_{1}'.format(fmt, dataHash(all_brackets, groups)))
+
+
+# This function walks the tables, yielding (group, key, year, name,
+# table) for every table. Pattern groups have no key, the conditional
+# tables are keyed by a tuple of (position, value) pairs.
+def iterTables(groups, conditionals):
+    for groupName in sorted(groups.keys()):
+        for name, pattern in groups[groupName].items():
+            for year, table in pattern.items():
+                if isinstance(year, int):
+                    yield groupName, None, year, name, table
+    for key, years in (conditionals or {}).items():
+        for year, names in years.items():
+            for name, table in names.items():
+                yield 'CONDITIONALS', key, year, name, table
+
+
+def saveTables(path, groups, conditionals):
+    cdfs = []
+    values = []
+    index = []
+    cdfOffset = 0
+    valueOffset = 0
+    for groupName, key, year, name, table in iterTables(groups, conditionals):
+        cdf = np.asarray(table['p'], dtype=float)
+        triplets = np.asarray(table['triplets'], dtype=np.int8)
+        cdfs.append(cdf)
+        values.append(triplets.ravel())
+        index.append({
+            'group': groupName,
+            'key': None if key is None else [[int(bit), int(value)] for bit, value in key],
+            'year': year,
+            'name': name,
+            'p': [cdfOffset, cdfOffset + cdf.size],
+            'triplets': [valueOffset, valueOffset + triplets.size],
+            'width': int(triplets.shape[1])
+        })
+        cdfOffset += cdf.size
+        valueOffset += triplets.size
+
+    # The tables are written to a temporary directory that is then
+    # renamed, so other processes never read a partial cache.
+    tmpPath = '{0}.{1}'.format(path, os.getpid())
+    if not os.path.exists(tmpPath):
+        os.makedirs(tmpPath)
+    np.save(os.path.join(tmpPath, 'cdfs.npy'), np.concatenate(cdfs))
+    np.save(os.path.join(tmpPath, 'values.npy'), np.concatenate(values))
+    with open(os.path.join(tmpPath, 'index.json'), 'w') as f:
+        json.dump(index, f)
+    try:
+        os.rename(tmpPath, path)
+    except OSError:
+        # another process saved the same tables first
+        shutil.rmtree(tmpPath)
+
+
+def loadTables(path, groups, conditionals):
+    cdfs = np.load(os.path.join(path, 'cdfs.npy'), mmap_mode='r')
+    values = np.load(os.path.join(path, 'values.npy'), mmap_mode='r')
+    with open(os.path.join(path, 'index.json')) as f:
+        index = json.load(f)
+
+    if conditionals is not None:
+        conditionals.clear()
+    for entry in index:
+        table = {
+            'p': cdfs[entry['p'][0]:entry['p'][1]],
+            'triplets': values[entry['triplets'][0]:entry['triplets'][1]].reshape(-1, entry['width'])
+        }
+        if entry['group'] == 'CONDITIONALS':
+            key = tuple((bit, value) for bit, value in entry['key'])
+            conditionals.setdefault(key, {}).setdefault(entry['year'], {})[entry['name']] = table
+        else:
+            groups[entry['group']][entry['name']][entry['year']] = table
+
+
+# This function fills the tables in place. groups maps the name of
+# every group of patterns (e.g. 'all_triplets') to its dictionary and
+# conditionals is the CONDITIONALS dictionary (or None). If the tables
+# of the format and data are not cached yet, compute() fills them and
+# they are saved for the next runs.
+def loadPatternTables(fmt, all_brackets, groups, conditionals, compute):
+    path = cachePath(fmt, all_brackets, groups)
+    if os.path.exists(os.path.join(path, 'index.json')):
+        loadTables(path, groups, conditionals)
+        return
+    compute()
+    saveTables(path, groups, conditionals)
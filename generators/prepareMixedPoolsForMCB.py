@@ -5,6 +5,7 @@ import numpy as np
 import sys
 
 from utils.calculateTailProbability import calculate_tail_p
+from utils.experimentCatalog import open_catalog
 from viz.scoresHistogram import analyze
 
 ######################################################################
@@ -29,13 +30,15 @@ if numTrials < 1000:
 else:
     trialsString = '{0}k'.format(int(numTrials / 1000))
 
+catalog = open_catalog()
 for year in range(2013, 2020):
     with open(models_path) as f:
         models = json.load(f)
     for batchNumber in range(minBatchNum, maxBatchNum + 1):
         for model in models['models']:
             name = model['modelName']
-            analyze(raw_summary, name, numTrials, batchNumber, year)
+            analyze(raw_summary, name, numTrials, batchNumber, year, catalog)
+catalog.close()
 
 for year in range(2013, 2020):
     sys.stdout.write('{0} Tournament:\n'.format(year))
@@ -179,6 +179,93 @@ def getE8SeedBottom(year, model=None):
     return seed
 
 
+############################################################
+# Batched samplers: the following functions return an array
+# of n samples from the same distributions as the functions
+# above, so a whole pool of brackets can be sampled at once.
+############################################################
+
+# Returns the CDF of a truncated geometric r.v. with parameter p
+# and probabilities that add to pSum, i.e., table[k] = P(X <= k)
+# for k = 0, 1, ..., up to the largest value getTruncGeom can return.
+def getTruncGeomTable(p, pSum):
+    kMax = int(ceil(log(1 - pSum) / log(1 - p)))
+    return 1. - (1. - p) ** np.arange(kMax + 1)
+
+
+# Returns n samples of a truncated geometric r.v. by inverting its
+# CDF: getTruncGeom returns the smallest k with table[k] >= u.
+# If p is an array (one perturbed parameter per sample) the
+# inverse is computed in closed form instead.
+def getTruncGeoms(p, pSum, n):
+    u = np.random.random_sample(n) * pSum
+    if np.ndim(p) == 0:
+        return np.searchsorted(getTruncGeomTable(p, pSum), u)
+    return np.ceil(np.log(1 - u) / np.log(1 - p)).astype(int)
+
+
+# Returns n perturbed probability values (see perturbProb), or the
+# probability itself if the model does not perturb it or the
+# perturbation is the same for every sample.
+def perturbProbs(prob, model, n):
+    if model and model.get('perturbation'):
+        if model['perturbation'].get('type', 'rv') == 'rv':
+            percent = model['perturbation'].get('percent', 0.1)
+            return np.clip(
+                prob + np.random.uniform(low=0, high=prob * percent, size=n), 0., 1.)
+    return perturbProb(prob, model)
+
+
+# Returns n seeds for the National Champion.
+def getChampions(year, n, model=None):
+    pC = perturbProbs(pChamp[year - 2013], model, n)
+    return getTruncGeoms(pC, champSum[year - 2013], n)
+
+
+# Returns n seeds for the National Runner-Up.
+def getRunnerUps(year, n, model=None):
+    pR = perturbProbs(pRU[year - 2013], model, n)
+    return getTruncGeoms(pR, ruSum[year - 2013], n)
+
+
+# Returns n seeds for the Final Four (Model1).
+def getF4SeedsTogether(year, n, model=None):
+    p = perturbProbs(pF4[year - 2013], model, n)
+    seeds = getTruncGeoms(p, pF4Sum[year - 2013], n)
+    seeds[np.random.random_sample(n) <= pF4Choose11[year - 2013]] = 11
+    return seeds
+
+
+# Returns n seeds for the Final Four (Model2).
+def getF4SeedsSplit(year, n, model=None):
+    nTopHalf = nTop[year - 2013]
+    nBottomHalf = nBottom[year - 2013]
+    pUseTop = nTopHalf * 1.0 / (nTopHalf + nBottomHalf)
+
+    p = perturbProbs(pF4Top[year - 2013], model, n)
+    seeds = getTruncGeoms(p, pF4TopSum[year - 2013], n)
+    seedList = np.array([7, 7, 8, 8, 9, 10, 11, 11, 12])
+    useBottom = np.random.random_sample(n) > pUseTop
+    seeds[useBottom] = seedList[np.random.randint(0, len(seedList), useBottom.sum())]
+    return seeds
+
+
+# Returns n seeds for the "top half" of the Elite Eight.
+def getE8SeedsTop(year, n, model=None):
+    p = perturbProbs(pE8Top[year - 2013], model, n)
+    seeds = np.array(topSeeds)[getTruncGeoms(p, pE8TopSum[year - 2013], n)]
+    seeds[np.random.random_sample(n) <= pE8Choose1[year - 2013]] = 1
+    return seeds
+
+
+# Returns n seeds for the "bottom half" of the Elite Eight.
+def getE8SeedsBottom(year, n, model=None):
+    p = perturbProbs(pE8Bottom[year - 2013], model, n)
+    seeds = np.array(bottomSeeds)[getTruncGeoms(p, pE8BottomSum[year - 2013], n)]
+    seeds[np.random.random_sample(n) <= pE8Choose11[year - 2013]] = 11
+    return seeds
+
+
 def toDistribution(x):
     tmp = np.exp(x)
     return tmp / np.sum(tmp)
@@ -1,8 +1,86 @@
 #!/usr/bin/env python
 import json
+import numpy as np
 from bracketClassDefinitions import Bracket
 from bracketClassDefinitions import Region
 from bracketClassDefinitions import buildBracketFromJson
+from utils.bracketFormats import convert_brackets, convert_codes, convert_vector
+from utils.bracketPacking import ROUND_GAMES, final_four_bits, pack_brackets, region_codes
+from utils.bracketPacking import round1_correct_picks, unique_brackets
+from utils.regionTables import GAME_LOSERS, GAME_WINNERS, N_REGION_CODES, REGION_SEEDS, REGION_WINNERS, ROUND_SLICES
+from utils.regionTables import bracket_region_codes, region_code
+
+# Contest scoring rules. Every correct pick in round r is worth
+# roundPoints[r-1], multiplied by the seed of the winning team when
+# seedMultiplier is set. Correct upset picks (a higher seed beating a
+# lower seed) additionally earn roundBonus[r-1] plus upsetBonus[r-1]
+# points for every seed of difference between both teams.
+SCORING_SYSTEMS = {
+	'ESPN': {
+		'roundPoints': [10, 20, 40, 80, 160, 320]
+	},
+	'Yahoo': {
+		'roundPoints': [1, 2, 4, 8, 16, 32]
+	},
+	'SeedMultiplier': {
+		'roundPoints': [1, 2, 3, 4, 5, 6],
+		'seedMultiplier': True
+	},
+	'UpsetBonus': {
+		'roundPoints': [10, 20, 40, 80, 160, 320],
+		'upsetBonus': [1, 2, 4, 8, 16, 32]
+	},
+	'RoundBonus': {
+		'roundPoints': [10, 20, 40, 80, 160, 320],
+		'roundBonus': [5, 10, 20, 40, 80, 160]
+	}
+}
+
+# Round of every game of the 63-element bracket vector
+GAME_ROUND_VECTOR = np.array(([1] * 8 + [2] * 4 + [3] * 2 + [4]) * 4 + [5, 5, 6])
+
+
+# This function adds a named rule set (see SCORING_SYSTEMS) so that
+# it can be passed by name to the scoring functions.
+def registerScoringSystem(name, rules):
+	if len(rules['roundPoints']) != 6:
+		raise ValueError('A scoring system needs the points of each of the 6 rounds')
+	SCORING_SYSTEMS[name] = rules
+
+
+# This function takes in a scoring system (either its name or a
+# rule set) and the actual bracket vector, and returns a 63-element
+# array with the points earned by correctly picking the winner of
+# each game. Points can depend on the seeds of the actual winner and
+# loser, so the weights are specific to the actual bracket.
+def compileScoringSystem(scoringSystem, actualResultsVector):
+	rules = SCORING_SYSTEMS[scoringSystem] if isinstance(scoringSystem, str) else scoringSystem
+	actualResults = np.asarray(actualResultsVector, dtype=int)
+	codes = bracket_region_codes(actualResults)[0]
+
+	winners = np.zeros(63, dtype=int)
+	losers = np.zeros(63, dtype=int)
+	winners[:60] = GAME_WINNERS[codes].reshape(-1)
+	losers[:60] = GAME_LOSERS[codes].reshape(-1)
+
+	# A 1 (0) in the Final Four bits indicates the top (bottom) team won
+	regionWinners = REGION_WINNERS[codes]
+	for game, (top, bottom) in enumerate([(regionWinners[0], regionWinners[1]), (regionWinners[2], regionWinners[3])]):
+		winners[60 + game], losers[60 + game] = (top, bottom) if actualResults[60 + game] == 1 else (bottom, top)
+	winners[62], losers[62] = (winners[60], winners[61]) if actualResults[62] == 1 else (winners[61], winners[60])
+
+	rounds = GAME_ROUND_VECTOR - 1
+	points = np.array(rules['roundPoints'])[rounds]
+	if rules.get('seedMultiplier', False):
+		points = points * winners
+
+	isUpset = winners > losers
+	if 'roundBonus' in rules:
+		points = points + isUpset * np.array(rules['roundBonus'])[rounds]
+	if 'upsetBonus' in rules:
+		points = points + isUpset * np.array(rules['upsetBonus'])[rounds] * (winners - losers)
+	return points
+
 
 # This function takes in a year and returns the actual
 # bracket vector from that year's tournament. 
@@ -25,6 +103,23 @@ def getActualBracketVector(year):
 	return correctVector
 
 
+# This function returns a dictionary with the actual bracket
+# vector of every year in allBracketsTTT.json, keyed by year.
+def getActualBracketVectors():
+	inputFilename = 'allBracketsTTT.json'
+	with open(inputFilename, 'r') as inputFile:
+		dataJson = inputFile.read().replace('\n', '')
+
+	dataPyDict = json.loads(dataJson)
+	bracketList = dataPyDict['brackets']
+
+	actualVectors = {}
+	for bracketDict in bracketList:
+		bracket = buildBracketFromJson(bracketDict['bracket'])
+		actualVectors[bracket.year] = [int(bracket.fullVector[i]) for i in range(len(bracket.fullVector))]
+	return actualVectors
+
+
 # This function takes in a list of seeds that competed
 # in a round within a region, listed from top to bottom
 # in the official bracket format. It also takes a list
@@ -46,7 +141,10 @@ def applyRoundResultsFFF(seeds, results):
 # flag indicates whether the bracket being scored is from the
 # Pick Favorite model, in which case we assume that it correctly
 # guesses the Final Four and National Championship outcomes.
-def scoreBracket(bracketVector, actualResultsVector, isPickFavorite = False):
+# The bracket can be given in either encoding (bracketFormat 'TTT'
+# or 'FFF'), whereas the actual results are always in TTT, as
+# returned by getActualBracketVector.
+def scoreBracket(bracketVector, actualResultsVector, isPickFavorite = False, bracketFormat = 'TTT'):
 	# Round score subtotals, with only indices 1-6 used
 	# as actual subtotals. The 0th element is the overall total.
 	roundScores = [0, 0, 0, 0, 0, 0, 0]
@@ -57,27 +155,16 @@ def scoreBracket(bracketVector, actualResultsVector, isPickFavorite = False):
 	# Compute Rounds 1-4 scores
 	for region in range(4):
 		start = 15 * region
-		end = start + 8
-		regionVector = bracketVector[start:end]
-		regionResultsVector = actualResultsVector[start:end]
-
-		seeds = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-		actualSeeds = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
+		end = start + 15
+		winners = GAME_WINNERS[convert_codes(region_code(bracketVector[start:end]), bracketFormat, 'TTT')]
+		actualWinners = GAME_WINNERS[region_code(actualResultsVector[start:end])]
+		matches = winners == actualWinners
 
 		for r in range(1, 5):
-			seeds = applyRoundResults(seeds, regionVector)
-			actualSeeds = applyRoundResults(actualSeeds, regionResultsVector)
-
-			matches = [i for i, j in zip(seeds, actualSeeds) if i == j]
-			roundScores[r] += 10 * (2 ** (r-1)) * len(matches)
+			roundScores[r] += 10 * (2 ** (r-1)) * int(np.count_nonzero(matches[ROUND_SLICES[r]]))
 
-			start = end
-			end += int(len(seeds) / 2)
-			regionVector = bracketVector[start:end]
-			regionResultsVector = actualResultsVector[start:end]
-
-		regionWinners.append(seeds[0])
-		actualRegionWinners.append(actualSeeds[0])
+		regionWinners.append(winners[14])
+		actualRegionWinners.append(actualWinners[14])
 
 	# Compute Rounds 5-6 scores
 	finalFourVector = bracketVector[-3:]
@@ -103,58 +190,301 @@ def scoreBracket(bracketVector, actualResultsVector, isPickFavorite = False):
 	return roundScores
 
 
-def scoreFFFBracket(bracketVector, actualResultsVector, isPickFavorite = False):
-	# Round score subtotals, with only indices 1-6 used
-	# as actual subtotals. The 0th element is the overall total.
-	roundScores = [0, 0, 0, 0, 0, 0, 0]
-
-	regionWinners = []
-	actualRegionWinners = []
-
-	# Compute Rounds 1-4 scores
+# This function scores a whole pool of brackets at once. It takes
+# an (N, 63) array (or list of 63-element lists) of 0s and 1s, or
+# an (N,) uint64 array of packed brackets (see utils/bracketPacking), and
+# returns an (N, 7) array of round scores with the same layout as
+# scoreBracket, i.e., column 0 holds the total and columns 1-6 the
+# round subtotals. The results are identical to calling scoreBracket
+# on every row, including the isPickFavorite override. Other contest
+# rules can be used through scoringSystem (see SCORING_SYSTEMS) and
+# FFF pools are scored by setting bracketFormat to 'FFF'.
+def scoreBrackets(bracketMatrix, actualResultsVector, isPickFavorite = False, scoringSystem = 'ESPN', bracketFormat = 'TTT'):
+	return ReferenceScorer(actualResultsVector, scoringSystem).score(bracketMatrix, isPickFavorite, bracketFormat)
+
+
+# This function takes in the actual bracket vector and returns a
+# (4, 32768, 4) array with the Rounds 1-4 score obtained by each of
+# the 2^15 possible outcomes of every region, i.e., entry [i, code, r-1]
+# is the round r score of a bracket whose region i has the given code.
+# The points of every game come from compileScoringSystem.
+def buildRegionScoreTables(actualResultsVector, gamePoints):
+	actualWinners = GAME_WINNERS[bracket_region_codes(actualResultsVector)[0]]
+	regionScores = np.zeros((4, N_REGION_CODES, 4), dtype=np.int32)
 	for region in range(4):
-		start = 15 * region
-		end = start + 8
-		regionVector = bracketVector[start:end]
-		regionResultsVector = actualResultsVector[start:end]
-
-		seeds = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-		actualSeeds = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-
+		matches = GAME_WINNERS == actualWinners[region]
+		regionPoints = gamePoints[15 * region: 15 * (region + 1)]
 		for r in range(1, 5):
-			seeds = applyRoundResultsFFF(seeds, regionVector)
-			actualSeeds = applyRoundResultsFFF(actualSeeds, regionResultsVector)
+			regionScores[region, :, r-1] = matches[:, ROUND_SLICES[r]].dot(regionPoints[ROUND_SLICES[r]])
+	return regionScores
+
+
+# Scores pools of brackets against a single actual bracket. The
+# regional score tables are built once when the scorer is created, so
+# scoring a bracket only takes 4 table lookups plus the Final Four and
+# championship checks.
+class ReferenceScorer:
+	def __init__(self, actualResultsVector, scoringSystem = 'ESPN'):
+		self.actualResults = np.asarray(actualResultsVector, dtype=int)
+		self.gamePoints = compileScoringSystem(scoringSystem, self.actualResults)
+		self.regionScores = buildRegionScoreTables(self.actualResults, self.gamePoints)
+		self.regionTotals = self.regionScores.sum(axis=2)
+		self.actualRegionWinners = REGION_WINNERS[bracket_region_codes(self.actualResults)[0]]
+		self.actualFinalFourVector = self.actualResults[-3:]
+		# When every Round 1 game is worth the same, the Round 1 score of
+		# a packed pool is counted with masks and popcounts instead of
+		# the region tables (see round1_correct_picks).
+		round1Points = self.gamePoints[ROUND_GAMES[1]]
+		self.round1Points = int(round1Points[0]) if np.all(round1Points == round1Points[0]) else None
+		self.actualPacked = {}
+
+	@classmethod
+	def fromYear(cls, year, scoringSystem = 'ESPN'):
+		return cls(getActualBracketVector(year), scoringSystem)
+
+	# Takes the same inputs as scoreBrackets and returns an (N, 7)
+	# array of round scores.
+	def score(self, bracketMatrix, isPickFavorite = False, bracketFormat = 'TTT'):
+		codes, finalFourMatrix = decodeBrackets(bracketMatrix, bracketFormat)
+		round1Scores = None
+		if self.round1Points is not None and np.asarray(bracketMatrix).dtype == np.uint64:
+			round1Scores = self.round1Points * self.round1CorrectPicks(bracketMatrix, bracketFormat)
+		return self.scoreDecoded(codes, finalFourMatrix, REGION_WINNERS[codes], isPickFavorite, round1Scores)
+
+	# Number of correct Round 1 picks of every bracket of a pool. The
+	# teams of Round 1 are known in advance, so a pick is correct iff
+	# its bit matches the bit of the actual bracket in the same format,
+	# and the picks of a packed bracket are counted with one popcount.
+	def round1CorrectPicks(self, bracketMatrix, bracketFormat = 'TTT'):
+		if bracketFormat not in self.actualPacked:
+			actualVector = convert_brackets(self.actualResults, 'TTT', bracketFormat)
+			self.actualPacked[bracketFormat] = pack_brackets(actualVector)[0]
+		brackets = np.asarray(bracketMatrix)
+		packed = brackets.reshape(-1) if brackets.dtype == np.uint64 else pack_brackets(brackets)
+		return round1_correct_picks(packed, self.actualPacked[bracketFormat])
+
+	# Fast path that only returns the total score of a single
+	# 63-element bracket vector, without building the round breakdown.
+	def scoreTotal(self, bracketVector, bracketFormat = 'TTT'):
+		codes = [convert_codes(region_code(bracketVector[15 * region: 15 * (region + 1)]), bracketFormat, 'TTT')
+				 for region in range(4)]
+		total = sum(self.regionTotals[region, code] for region, code in enumerate(codes))
+
+		correctWinners = REGION_WINNERS[codes] == self.actualRegionWinners
+		finalFourVector = [int(bit) for bit in bracketVector[-3:]]
+		actualFinalFourVector = self.actualFinalFourVector
+		finalFourPoints = self.gamePoints[60:]
+
+		isCorrectFirstSemifinal = finalFourVector[0] == actualFinalFourVector[0] and correctWinners[1 - finalFourVector[0]]
+		isCorrectSecondSemifinal = finalFourVector[1] == actualFinalFourVector[1] and correctWinners[3 - finalFourVector[1]]
+		isCorrectChampion = finalFourVector[2] == actualFinalFourVector[2] and (isCorrectFirstSemifinal if finalFourVector[2] == 1 else isCorrectSecondSemifinal)
+
+		total += finalFourPoints[0] * isCorrectFirstSemifinal + finalFourPoints[1] * isCorrectSecondSemifinal + finalFourPoints[2] * isCorrectChampion
+		return int(total)
+
+	# Vectorized version of scoreTotal: returns the (N,) total scores of
+	# a pool (same inputs as score) without building the round
+	# breakdown, i.e., the region totals plus the Final Four points.
+	def scoreTotals(self, bracketMatrix, bracketFormat = 'TTT'):
+		codes, finalFourMatrix = decodeBrackets(bracketMatrix, bracketFormat)
+		totals = self.regionTotals[np.arange(4), codes].sum(axis=1)
+		correctWinners = REGION_WINNERS[codes] == self.actualRegionWinners
+		totals += finalFourScores(finalFourMatrix, correctWinners, self.actualFinalFourVector, self.gamePoints[60:]).sum(axis=1)
+		return totals
+
+	# Same as score, but every distinct bracket of the pool is scored
+	# only once and its scores are copied to all of its duplicates.
+	# This pays off for low-entropy models that generate many copies
+	# of the same bracket.
+	def scoreUnique(self, bracketMatrix, isPickFavorite = False, bracketFormat = 'TTT'):
+		uniqueBrackets, inverse, _ = unique_brackets(bracketMatrix)
+		return self.score(uniqueBrackets, isPickFavorite, bracketFormat)[inverse]
+
+	# Same as scoreTotals, scoring every distinct bracket only once.
+	def scoreUniqueTotals(self, bracketMatrix, bracketFormat = 'TTT'):
+		uniqueBrackets, inverse, _ = unique_brackets(bracketMatrix)
+		return self.scoreTotals(uniqueBrackets, bracketFormat)[inverse]
+
+	# Same as score, but for a pool that was already decoded into its
+	# region codes, Final Four bits and region winners. The Round 1
+	# scores can be given when they were already counted.
+	def scoreDecoded(self, codes, finalFourMatrix, regionWinners, isPickFavorite = False, round1Scores = None):
+		nBrackets = codes.shape[0]
+
+		roundScores = np.zeros((nBrackets, 7), dtype=int)
+
+		# Compute Rounds 1-4 scores
+		if round1Scores is None:
+			regionRoundScores = self.regionScores[np.arange(4), codes]
+			roundScores[:, 1:5] = regionRoundScores.sum(axis=1)
+		else:
+			regionRoundScores = self.regionScores[np.arange(4), codes, 1:]
+			roundScores[:, 1] = round1Scores
+			roundScores[:, 2:5] = regionRoundScores.sum(axis=1)
+
+		# Compute Rounds 5-6 scores
+		if isPickFavorite:
+			finalFourMatrix = np.tile(self.actualFinalFourVector, (nBrackets, 1))
+
+		correctWinners = regionWinners == self.actualRegionWinners
+		roundScores[:, 5:7] = finalFourScores(finalFourMatrix, correctWinners, self.actualFinalFourVector, self.gamePoints[60:])
+
+		roundScores[:, 0] = roundScores[:, 1:].sum(axis=1)
+		return roundScores
+
+
+# Scores a pool of brackets against the actual bracket of several
+# years at once. The pool is decoded only once and every year reuses
+# its own precomputed ReferenceScorer tables.
+class MultiReferenceScorer:
+	def __init__(self, years = None, scoringSystem = 'ESPN'):
+		actualVectors = getActualBracketVectors()
+		if years is None:
+			years = sorted(actualVectors.keys())
+		self.years = list(years)
+		self.scorers = [ReferenceScorer(actualVectors[year], scoringSystem) for year in self.years]
+
+	# Returns an (N, len(years), 7) array where entry [i, j] holds the
+	# round scores of bracket i against the tournament of years[j].
+	def score(self, bracketMatrix, isPickFavorite = False, bracketFormat = 'TTT'):
+		codes, finalFourMatrix = decodeBrackets(bracketMatrix, bracketFormat)
+		regionWinners = REGION_WINNERS[codes]
+		roundScores = np.zeros((codes.shape[0], len(self.years), 7), dtype=int)
+		for j, scorer in enumerate(self.scorers):
+			roundScores[:, j, :] = scorer.scoreDecoded(codes, finalFourMatrix, regionWinners, isPickFavorite)
+		return roundScores
+
+
+# This function scores a pool against every tournament year in
+# allBracketsTTT.json (or only the given years) and returns the
+# (N, years, 7) score array together with the list of years.
+def scoreBracketsAllYears(bracketMatrix, years = None, isPickFavorite = False, scoringSystem = 'ESPN', bracketFormat = 'TTT'):
+	scorer = MultiReferenceScorer(years, scoringSystem)
+	return scorer.score(bracketMatrix, isPickFavorite, bracketFormat), scorer.years
+
+
+# This function takes in a partially known actual bracket vector,
+# where -1 marks a game that has not been played yet, and returns the
+# team that won each of the 63 games (-1 if the game is not decided)
+# together with a boolean array of the teams already eliminated.
+# Teams are numbered 17 * region + seed.
+def getLiveResults(partialResultsVector):
+	results = [int(bit) for bit in partialResultsVector]
+	winners = np.full(63, -1, dtype=int)
+	eliminated = np.zeros(4 * 17, dtype=bool)
+
+	def playGame(game, top, bottom):
+		if results[game] == -1 or top == -1 or bottom == -1:
+			return -1
+		winner, loser = (top, bottom) if results[game] == 1 else (bottom, top)
+		eliminated[loser] = True
+		winners[game] = winner
+		return winner
 
-			matches = [i for i, j in zip(seeds, actualSeeds) if i == j]
-			roundScores[r] += 10 * (2 ** (r-1)) * len(matches)
-
-			start = end
-			end += int(len(seeds) / 2)
-			regionVector = bracketVector[start:end]
-			regionResultsVector = actualResultsVector[start:end]
-
-		regionWinners.append(seeds[0])
-		actualRegionWinners.append(actualSeeds[0])
-
-	# Compute Rounds 5-6 scores
-	finalFourVector = bracketVector[-3:]
-	actualFinalFourVector = actualResultsVector[-3:]
-
-	if isPickFavorite:
-		finalFourVector = actualFinalFourVector
-
-	isCorrectFirstSemifinal = (finalFourVector[0] == actualFinalFourVector[0]) and ((finalFourVector[0] == 1 and (regionWinners[0] == actualRegionWinners[0])) or (finalFourVector[0] == 0 and (regionWinners[1] == actualRegionWinners[1])))
-	if isCorrectFirstSemifinal:
-		roundScores[5] += 160
-
-	isCorrectSecondSemifinal = (finalFourVector[1] == actualFinalFourVector[1]) and ((finalFourVector[1] == 1 and (regionWinners[2] == actualRegionWinners[2])) or (finalFourVector[1] == 0 and (regionWinners[3] == actualRegionWinners[3])))
-
-	if isCorrectSecondSemifinal:
-		roundScores[5] += 160
-
-	isCorrectChampion = (finalFourVector[2] == actualFinalFourVector[2]) and ((finalFourVector[2] == 1 and isCorrectFirstSemifinal) or (finalFourVector[2] == 0 and isCorrectSecondSemifinal))
-	if isCorrectChampion:
-		roundScores[6] += 320
-
-	roundScores[0] = sum(roundScores)
-	return roundScores
\ No newline at end of file
+	regionWinners = []
+	for region in range(4):
+		teams = [17 * region + seed for seed in REGION_SEEDS]
+		game = 15 * region
+		while len(teams) > 1:
+			nextTeams = []
+			for i in range(len(teams) // 2):
+				nextTeams.append(playGame(game, teams[2*i], teams[2*i+1]))
+				game += 1
+			teams = nextTeams
+		regionWinners.append(teams[0])
+
+	firstFinalist = playGame(60, regionWinners[0], regionWinners[1])
+	secondFinalist = playGame(61, regionWinners[2], regionWinners[3])
+	playGame(62, firstFinalist, secondFinalist)
+	return winners, eliminated
+
+
+# This function takes in a pool of brackets (see scoreBrackets) and
+# returns an (N, 63) array with the team each bracket picks to win
+# every game, numbered as in getLiveResults.
+def getPickedTeams(bracketMatrix, bracketFormat = 'TTT'):
+	codes, finalFourMatrix = decodeBrackets(bracketMatrix, bracketFormat)
+	nBrackets = codes.shape[0]
+	picks = np.zeros((nBrackets, 63), dtype=int)
+	picks[:, :60] = (GAME_WINNERS[codes] + 17 * np.arange(4)[:, np.newaxis]).reshape(nBrackets, 60)
+
+	regionWinners = picks[:, 14:60:15]
+	picks[:, 60] = np.where(finalFourMatrix[:, 0] == 1, regionWinners[:, 0], regionWinners[:, 1])
+	picks[:, 61] = np.where(finalFourMatrix[:, 1] == 1, regionWinners[:, 2], regionWinners[:, 3])
+	picks[:, 62] = np.where(finalFourMatrix[:, 2] == 1, picks[:, 60], picks[:, 61])
+	return picks
+
+
+# This function scores a pool while the tournament is in progress.
+# It takes the partial actual results (-1 for the games not played
+# yet) and returns two arrays with the current score of every bracket
+# and the maximum score it can still reach, i.e., the current score
+# plus the points of every pending game whose picked winner has not
+# been eliminated. Brackets whose maximum is below the current leader
+# can no longer win and can be pruned. Upset bonuses depend on teams
+# that are not known yet, so only scoring systems based on round
+# points (and the seed multiplier) are supported.
+def scoreBracketsLive(bracketMatrix, partialResultsVector, scoringSystem = 'ESPN', bracketFormat = 'TTT'):
+	rules = SCORING_SYSTEMS[scoringSystem] if isinstance(scoringSystem, str) else scoringSystem
+	if 'upsetBonus' in rules or 'roundBonus' in rules:
+		raise ValueError('Live scoring does not support upset bonuses')
+
+	picks = getPickedTeams(bracketMatrix, bracketFormat)
+	actualWinners, eliminated = getLiveResults(partialResultsVector)
+
+	points = np.tile(np.array(rules['roundPoints'])[GAME_ROUND_VECTOR - 1], (picks.shape[0], 1))
+	if rules.get('seedMultiplier', False):
+		points = points * (picks % 17)
+
+	isDecided = actualWinners != -1
+	isCorrect = picks == actualWinners
+	isAlive = ~isDecided & ~eliminated[picks]
+
+	currentScores = (points * isCorrect).sum(axis=1)
+	maxScores = currentScores + (points * isAlive).sum(axis=1)
+	return currentScores, maxScores
+
+
+# This function takes in a pool of brackets, either as an (N, 63)
+# array or an (N,) array of packed brackets, and returns the (N, 4)
+# region codes and the (N, 3) Final Four bits. Region codes of FFF
+# brackets are translated to TTT, so both encodings share the rest
+# of the scoring code.
+def decodeBrackets(bracketMatrix, bracketFormat = 'TTT'):
+	brackets = np.asarray(bracketMatrix)
+	if brackets.dtype == np.uint64:
+		packedBrackets = brackets.reshape(-1)
+		codes, finalFourMatrix = region_codes(packedBrackets), final_four_bits(packedBrackets)
+	else:
+		brackets = brackets.astype(int)
+		if brackets.ndim == 1:
+			brackets = brackets.reshape(1, -1)
+		codes, finalFourMatrix = bracket_region_codes(brackets), brackets[:, -3:]
+	return convert_codes(codes, bracketFormat, 'TTT'), finalFourMatrix
+
+
+# This function computes the Rounds 5-6 scores of a pool given its
+# Final Four bits and whether each of its region winners is correct.
+# finalFourPoints holds the points of games 60-62 (see
+# compileScoringSystem). It returns an (N, 2) array with the semifinal
+# and championship scores.
+def finalFourScores(finalFourMatrix, correctWinners, actualFinalFourVector, finalFourPoints):
+	correctPicks = finalFourMatrix == actualFinalFourVector
+
+	isCorrectFirstSemifinal = correctPicks[:, 0] & (((finalFourMatrix[:, 0] == 1) & correctWinners[:, 0]) | ((finalFourMatrix[:, 0] == 0) & correctWinners[:, 1]))
+	isCorrectSecondSemifinal = correctPicks[:, 1] & (((finalFourMatrix[:, 1] == 1) & correctWinners[:, 2]) | ((finalFourMatrix[:, 1] == 0) & correctWinners[:, 3]))
+	isCorrectChampion = correctPicks[:, 2] & (((finalFourMatrix[:, 2] == 1) & isCorrectFirstSemifinal) | ((finalFourMatrix[:, 2] == 0) & isCorrectSecondSemifinal))
+
+	scores = np.zeros((finalFourMatrix.shape[0], 2), dtype=int)
+	scores[:, 0] = finalFourPoints[0] * isCorrectFirstSemifinal + finalFourPoints[1] * isCorrectSecondSemifinal
+	scores[:, 1] = finalFourPoints[2] * isCorrectChampion
+	return scores
+
+
+# This function scores a bracket in which both the bracket and the
+# actual results are FFF vectors. It is kept for compatibility, new
+# code should call scoreBracket with bracketFormat = 'FFF' and the
+# TTT actual results.
+def scoreFFFBracket(bracketVector, actualResultsVector, isPickFavorite = False):
+	actualResults = convert_vector(list(actualResultsVector), 'FFF', 'TTT')
+	return scoreBracket(bracketVector, actualResults, isPickFavorite, 'FFF')
@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+import numpy as np
+import random
+from math import floor
+
+from samplingUtils import getE8SeedBottom, getE8SeedTop
+from samplingUtils import getF4SeedSplit, getF4SeedTogether
+from samplingUtils import getChampion, getRunnerUp
+from samplingUtils import getE8SeedsBottom, getE8SeedsTop
+from samplingUtils import getF4SeedsSplit, getF4SeedsTogether
+from samplingUtils import getChampions, getRunnerUps
+from utils.bracketPacking import pack_brackets
+from utils.regionTables import REGION_SEEDS
+
+# This module holds the bracket simulation shared by the seed-based
+# generators (Power, SA, SA2019, Bradley-Terry and Bradley-Terry 2019).
+# The generators only differ in how they estimate the probability that
+# a seed beats another one, so each of them compiles its model into a
+# matchup probability tensor P (see matchupProbabilities.py) and passes
+# it to these functions.
+#
+# The supported endModels are E8, F4_1, F4_2, Rev (e.g. Rev_2), Rev_4
+# and NCG_E8, which fix some seeds in advance before the rest of the
+# games are simulated.
+
+TOP_SEEDS = [1, 16, 8, 9, 5, 12, 4, 13]
+BOTTOM_SEEDS = [6, 11, 3, 14, 7, 10, 2, 15]
+
+
+# This function samples the seeds fixed in advance by the model's
+# endModel (E8, F4_1, F4_2, Rev, Rev_4, NCG_E8). It returns the
+# endModel, the 8 Elite Eight seeds and the 4 Final Four seeds (-1
+# when not fixed), and the regions of the champion and runner-up
+# (-1 when not fixed). Unless perturbed is False, the samplers
+# apply the model's perturbation to their parameters.
+def sampleEndModelSeeds(model, year, perturbed=True):
+    samplerModel = model if perturbed else None
+
+    endModel = 'None'
+    if 'endModel' in model:
+        endModel = model['endModel']
+
+    NCG_E8 = 'NCG_E8'
+    e8Seeds = []
+    if endModel == 'E8' or endModel == NCG_E8:
+        for i in range(4):
+            e8Seeds.append(getE8SeedTop(year, samplerModel))
+            e8Seeds.append(getE8SeedBottom(year, samplerModel))
+    else:
+        e8Seeds = [-1, -1, -1, -1, -1, -1, -1, -1]
+
+    f4Seeds = []
+    if endModel == 'F4_1':
+        for i in range(4):
+            seed = getF4SeedTogether(year, samplerModel)
+            f4Seeds.append(seed)
+            if endModel == NCG_E8:
+                if seed in TOP_SEEDS:
+                    e8Seeds[i * 2] = seed
+                else:
+                    e8Seeds[i * 2 + 1] = seed
+    elif endModel == 'F4_2':
+        for i in range(4):
+            f4Seeds.append(getF4SeedSplit(year, samplerModel))
+    else:
+        f4Seeds = [-1, -1, -1, -1]
+
+    if 'Rev' in endModel or endModel == NCG_E8:
+        champion = getChampion(year, samplerModel)
+        runnerUp = getRunnerUp(year, samplerModel)
+        champRegion = int(floor(random.random() * 4))
+        ruRegion = int(floor(random.random() * 2))
+
+        ffrRegion = 1 - ruRegion
+
+        if champRegion < 2:
+            ruRegion += 2
+            ffrRegion += 2
+            ffcRegion = 1 - champRegion
+        else:
+            ffcRegion = 5 - champRegion
+
+        f4Seeds[champRegion] = champion
+        f4Seeds[ruRegion] = runnerUp
+
+        if endModel == NCG_E8:
+            if champion in TOP_SEEDS:
+                e8Seeds[champRegion * 2] = champion
+            else:
+                e8Seeds[champRegion * 2 + 1] = champion
+            if runnerUp in TOP_SEEDS:
+                e8Seeds[ruRegion * 2] = runnerUp
+            else:
+                e8Seeds[ruRegion * 2 + 1] = runnerUp
+
+    else:
+        champRegion = -1
+        ruRegion = -1
+
+    if endModel == 'Rev_4':
+        f4Seeds[ffcRegion] = getF4SeedTogether(year, samplerModel)
+        f4Seeds[ffrRegion] = getF4SeedTogether(year, samplerModel)
+
+    return endModel, e8Seeds, f4Seeds, champRegion, ruRegion
+
+
+# This function samples the end-model seeds of n brackets at once,
+# see sampleEndModelSeeds. It returns the endModel, an (n, 8) array
+# of Elite Eight seeds, an (n, 4) array of Final Four seeds and the
+# (n,) arrays with the regions of the champion and runner-up.
+def sampleEndModelSeedArrays(model, year, n, perturbed=True):
+    samplerModel = model if perturbed else None
+    rows = np.arange(n)
+
+    endModel = 'None'
+    if 'endModel' in model:
+        endModel = model['endModel']
+
+    NCG_E8 = 'NCG_E8'
+    e8Seeds = -np.ones((n, 8), dtype=int)
+    if endModel == 'E8' or endModel == NCG_E8:
+        e8Seeds[:, 0::2] = getE8SeedsTop(year, 4 * n, samplerModel).reshape(n, 4)
+        e8Seeds[:, 1::2] = getE8SeedsBottom(year, 4 * n, samplerModel).reshape(n, 4)
+
+    f4Seeds = -np.ones((n, 4), dtype=int)
+    if endModel == 'F4_1':
+        f4Seeds = getF4SeedsTogether(year, 4 * n, samplerModel).reshape(n, 4)
+    elif endModel == 'F4_2':
+        f4Seeds = getF4SeedsSplit(year, 4 * n, samplerModel).reshape(n, 4)
+
+    if 'Rev' in endModel or endModel == NCG_E8:
+        champion = getChampions(year, n, samplerModel)
+        runnerUp = getRunnerUps(year, n, samplerModel)
+        champRegion = np.random.randint(0, 4, n)
+        ruRegion = np.random.randint(0, 2, n)
+
+        ffrRegion = 1 - ruRegion
+
+        topHalf = champRegion < 2
+        ruRegion[topHalf] += 2
+        ffrRegion[topHalf] += 2
+        ffcRegion = np.where(topHalf, 1 - champRegion, 5 - champRegion)
+
+        f4Seeds[rows, champRegion] = champion
+        f4Seeds[rows, ruRegion] = runnerUp
+
+        if endModel == NCG_E8:
+            isBottom = ~np.in1d(champion, TOP_SEEDS)
+            e8Seeds[rows, champRegion * 2 + isBottom] = champion
+            isBottom = ~np.in1d(runnerUp, TOP_SEEDS)
+            e8Seeds[rows, ruRegion * 2 + isBottom] = runnerUp
+    else:
+        champRegion = -np.ones(n, dtype=int)
+        ruRegion = -np.ones(n, dtype=int)
+
+    if endModel == 'Rev_4':
+        f4Seeds[rows, ffcRegion] = getF4SeedsTogether(year, n, samplerModel)
+        f4Seeds[rows, ffrRegion] = getF4SeedsTogether(year, n, samplerModel)
+
+    return endModel, e8Seeds, f4Seeds, champRegion, ruRegion
+
+
+# This function generates a 63-element list of 0s and 1s
+# to represent game outcomes in a bracket. P is the model's
+# matchup probability tensor (see matchupProbabilities.py).
+def simulateBracket(P, model, year, perturbed=True):
+    fmt = model.get('format', 'TTT')
+
+    bracket = []
+
+    endModel, e8Seeds, f4Seeds, champRegion, ruRegion = sampleEndModelSeeds(model, year, perturbed)
+    champHalf = champRegion // 2
+    ncgSeeds = [-1, -1]
+
+    # Loop through regional rounds R64, R32, and S16
+    for region in range(4):
+        seeds = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
+        for roundNum in range(1, 5):
+            numGames = int(len(seeds) / 2)
+            newSeeds = []
+            for gameNum in range(numGames):
+                s1 = seeds[2 * gameNum]
+                s2 = seeds[2 * gameNum + 1]
+
+                # Force any fixed F4/E8 seeds to make it through
+                s1Wins = (s1 == f4Seeds[region]) or ((roundNum < 4) and ((s1 == e8Seeds[2*region]) or (s1 == e8Seeds[2*region + 1])))
+                s2Wins = (s2 == f4Seeds[region]) or ((roundNum < 4) and ((s2 == e8Seeds[2*region]) or (s2 == e8Seeds[2*region + 1])))
+
+                if s1Wins:
+                    p = 1
+                elif s2Wins:
+                    p = 0
+                else:
+                    p = P[roundNum - 1, s1, s2]
+
+                if random.random() <= p:
+                    bracket.append(1 if fmt == 'TTT' else (1 if s1 < s2 else 0))
+                    newSeeds.append(s1)
+                else:
+                    bracket.append(0 if fmt == 'TTT' else (1 if s2 < s1 else 0))
+                    newSeeds.append(s2)
+            seeds = newSeeds
+        f4Seeds[region] = seeds[0]
+    bracket = bracket + [-1, -1, -1]
+
+    # Round 5:
+    for gameNum in range(2):
+        s1 = f4Seeds[2 * gameNum]
+        s2 = f4Seeds[2 * gameNum + 1]
+
+        if 'Rev' in endModel:
+            if (2 * gameNum == champRegion) or (2 * gameNum == ruRegion):
+                p = 1
+            elif (2 * gameNum + 1 == champRegion) or (2 * gameNum + 1 == ruRegion):
+                p = 0
+            else:
+                p = P[4, s1, s2]
+        else:
+            p = P[4, s1, s2]
+
+        if random.random() <= p:
+            bracket[60 + gameNum] = 1
+            ncgSeeds[gameNum] = s1
+        else:
+            bracket[60 + gameNum] = 0
+            ncgSeeds[gameNum] = s2
+
+    # Round 6:
+    s1 = ncgSeeds[0]
+    s2 = ncgSeeds[1]
+
+    if 'Rev' in endModel:
+        if champHalf == 0:
+            p = 1
+        else:
+            p = 0
+    else:
+        p = P[5, s1, s2]
+
+    if random.random() <= p:
+        bracket[-1] = 1
+    else:
+        bracket[-1] = 0
+
+    # assert len(bracket) == 63
+    # assert np.count_nonzero(np.array(bracket) == -1) == 0
+    return bracket
+
+
+# This function generates n brackets at once and returns them as
+# an (n, 63) array of 0s and 1s (or as packed brackets). Instead of
+# playing one game at a time, every round advances the seeds of all
+# brackets together. The brackets follow the same distribution as
+# the ones produced by simulateBracket.
+def simulateBrackets(P, model, year, n, packed=False, perturbed=True):
+    fmt = model.get('format', 'TTT')
+
+    endModel, e8Seeds, f4Seeds, champRegion, ruRegion = sampleEndModelSeedArrays(model, year, n, perturbed)
+
+    brackets = np.zeros((n, 63), dtype=np.uint8)
+
+    # Regional rounds: seeds has shape (n, 4 regions, teams left)
+    seeds = np.tile(REGION_SEEDS, (n, 4, 1))
+    start = 0
+    for roundNum in range(1, 5):
+        s1 = seeds[:, :, 0::2]
+        s2 = seeds[:, :, 1::2]
+        numGames = s1.shape[2]
+
+        # Force any fixed F4/E8 seeds to make it through
+        fixedF4 = f4Seeds[:, :, np.newaxis]
+        fixedE8Top = e8Seeds[:, 0::2, np.newaxis]
+        fixedE8Bottom = e8Seeds[:, 1::2, np.newaxis]
+        s1Wins = (s1 == fixedF4) | ((roundNum < 4) & ((s1 == fixedE8Top) | (s1 == fixedE8Bottom)))
+        s2Wins = (s2 == fixedF4) | ((roundNum < 4) & ((s2 == fixedE8Top) | (s2 == fixedE8Bottom)))
+
+        p = np.where(s1Wins, 1., np.where(s2Wins, 0., P[roundNum - 1, s1, s2]))
+        s1Won = np.random.random_sample(p.shape) <= p
+        if fmt == 'TTT':
+            bits = s1Won
+        else:
+            bits = np.where(s1Won, s1 < s2, s2 < s1)
+        for region in range(4):
+            offset = region * 15 + start
+            brackets[:, offset:offset + numGames] = bits[:, region, :]
+
+        seeds = np.where(s1Won, s1, s2)
+        start += numGames
+    f4Seeds = seeds[:, :, 0]
+
+    # Round 5:
+    isRev = 'Rev' in endModel
+    ncgSeeds = np.zeros((n, 2), dtype=int)
+    for gameNum in range(2):
+        s1 = f4Seeds[:, 2 * gameNum]
+        s2 = f4Seeds[:, 2 * gameNum + 1]
+        p = P[4, s1, s2]
+        if isRev:
+            topFixed = (champRegion == 2 * gameNum) | (ruRegion == 2 * gameNum)
+            bottomFixed = (champRegion == 2 * gameNum + 1) | (ruRegion == 2 * gameNum + 1)
+            p = np.where(topFixed, 1., np.where(bottomFixed, 0., p))
+        s1Won = np.random.random_sample(n) <= p
+        brackets[:, 60 + gameNum] = s1Won
+        ncgSeeds[:, gameNum] = np.where(s1Won, s1, s2)
+
+    # Round 6:
+    if isRev:
+        p = (champRegion // 2 == 0).astype(float)
+    else:
+        p = P[5, ncgSeeds[:, 0], ncgSeeds[:, 1]]
+    brackets[:, 62] = np.random.random_sample(n) <= p
+
+    if packed:
+        return pack_brackets(brackets)
+    return brackets
@@ -6,10 +6,12 @@ import sys
 from math import log
 from bracketClassDefinitions import Bracket
 from bracketClassDefinitions import Region
-from bracketClassDefinitions import SimpleBracket
 from bracketClassDefinitions import buildBracketFromJson
 from scoringUtils import applyRoundResults
 from scoringUtils import scoreBracket
+from utils.poolStats import summarize_histogram, summarize_scores
+from utils.experimentCatalog import open_catalog
+from utils.scoreStore import load_histogram, load_scores
 import numpy as np
 
 
@@ -30,52 +32,26 @@ def summarizeBatch(numTrials, batchNumber, modelsList, outputFile):
         percentile95 = []
         percentile99 = []
         proportionsAbovePF = []
-
-        if numTrials < MEAN_MEDIAN_VAR_CUTOFF:
-            meanScores = []
-            varianceScores = []
-            medianScores = []
+        meanScores = []
+        varianceScores = []
+        medianScores = []
+        uniqueBrackets = []
 
         for index in range(numModels):
             modelName = modelsList[index]['modelName']
 
-            if numTrials < 1000:
-                folderName = 'Experiments/{0}Trials'.format(numTrials)
-            else:
-                folderName = 'Experiments/{0}kTrials'.format(
-                    int(numTrials / 1000))
-
-            batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
-            inputFilename = '{2}/generatedScores_{0}_{1}.json'.format(
-                modelName, year, batchFolderName)
-
-            if not os.path.exists(inputFilename):
+            # The catalog knows which units were run and where their
+            # scores are, so nothing is probed in the file system
+            entry = catalog.find(modelName, numTrials, year, batchNumber)
+            if entry is None or entry['path'] is None:
                 continue
 
             outputFile.write('{0},'.format(modelName))
-            with open(inputFilename, 'r') as inputFile:
-                dataJson = inputFile.read().replace('\n', '')
-
-            dataPyDict = json.loads(dataJson)
-            scores = dataPyDict['scores']
-
-            brackets = []
-            for score in scores:
-                newBracket = SimpleBracket(None, [score])
-                brackets.append(newBracket)
-
-            nBrackets = len(brackets)
-
-            # Determine max scoring bracket, as well as 95/99th percentiles
-            brackets.sort(key=lambda x: x.scores[0], reverse=True)
-            maxScoringBracket = brackets[0]
-            minScoringBracket = brackets[-1]
-            bracket95 = brackets[int(0.05 * nBrackets) - 1]
-            bracket99 = brackets[int(0.01 * nBrackets) - 1]
-
-            # Determine max correct picks
-            # brackets.sort(key=lambda x: x.correctPicks, reverse=True)
-            # maxCorrectPicksBracket = brackets[0]
+            if entry['histogram']:
+                histogram, dataPyDict = load_histogram(entry['path'])
+            else:
+                histogram = None
+                scores, dataPyDict = load_scores(entry['path'])
 
             # Determine score of Pick Favorite model
             actualBracket = dataPyDict['actualBracket']
@@ -88,32 +64,27 @@ def summarizeBatch(numTrials, batchNumber, modelsList, outputFile):
                                     True)
             pfTotalScore = pfScores[0]
 
-            bracketsAbovePickFavorite = [b for b in brackets if
-                                         b.scores[0] >= pfTotalScore]
-            nBracketsAbovePF = len(bracketsAbovePickFavorite)
-            proportionAbovePF = nBracketsAbovePF * 1.0 / nBrackets
-
-            bracketsInEspnLeaderboard = [b for b in brackets if
-                                         b.scores[0] >= espnMin[year - 2013]]
-            countAboveEspnMin.append(len(bracketsInEspnLeaderboard))
-
-            if numTrials < MEAN_MEDIAN_VAR_CUTOFF:
-                scores = [x.scores[0] for x in brackets]
-                meanScore = np.mean(scores)
-                varianceScore = np.var(scores)
-                medianScore = np.median(scores)
+            # Every statistic comes either from the 193 score counts or
+            # from a single pass over the scores
+            if histogram is not None:
+                stats = summarize_histogram(histogram, pfTotalScore, espnMin[year - 2013])
+            else:
+                stats = summarize_scores(scores, pfTotalScore, espnMin[year - 2013])
 
-            maxScores.append(maxScoringBracket.scores[0])
-            minScores.append(minScoringBracket.scores[0])
+            maxScores.append(stats['max'])
+            minScores.append(stats['min'])
             # maxCorrectPicks.append(maxCorrectPicksBracket.correctPicks)
-            percentile95.append(bracket95.scores[0])
-            percentile99.append(bracket99.scores[0])
-            proportionsAbovePF.append(proportionAbovePF)
-
-            if numTrials < MEAN_MEDIAN_VAR_CUTOFF:
-                meanScores.append(meanScore)
-                varianceScores.append(varianceScore)
-                medianScores.append(medianScore)
+            percentile95.append(stats['percentile95'])
+            percentile99.append(stats['percentile99'])
+            proportionsAbovePF.append(stats['proportionAbovePF'])
+            countAboveEspnMin.append(stats['countAboveEspnMin'])
+            meanScores.append(stats['mean'])
+            varianceScores.append(stats['var'])
+            medianScores.append(stats['median'])
+            # the diversity of the pool is only known for the units
+            # recorded by the generators (see experimentUtils.py)
+            diversity = (entry['metrics'] or {}).get('diversity')
+            uniqueBrackets.append('' if diversity is None else diversity['unique'])
 
         outputFile.write('\n')
 
@@ -126,22 +97,21 @@ def summarizeBatch(numTrials, batchNumber, modelsList, outputFile):
             outputFile.write('{0},'.format(val))
         outputFile.write('\n')
 
-        if numTrials < MEAN_MEDIAN_VAR_CUTOFF:
-            outputFile.write('Median score,')
-            for val in medianScores:
-                outputFile.write('{0},'.format(val))
-            outputFile.write('\n')
+        outputFile.write('Median score,')
+        for val in medianScores:
+            outputFile.write('{0},'.format(val))
+        outputFile.write('\n')
 
-            outputFile.write('Mean score,')
-            for val in meanScores:
-                outputFile.write('{0},'.format(val))
-            outputFile.write('')
-            outputFile.write('\n')
+        outputFile.write('Mean score,')
+        for val in meanScores:
+            outputFile.write('{0},'.format(val))
+        outputFile.write('')
+        outputFile.write('\n')
 
-            outputFile.write('Var(scores),')
-            for val in varianceScores:
-                outputFile.write('{0},'.format(val))
-            outputFile.write('\n')
+        outputFile.write('Var(scores),')
+        for val in varianceScores:
+            outputFile.write('{0},'.format(val))
+        outputFile.write('\n')
 
         outputFile.write('No. in ESPN top 100,')
         for val in countAboveEspnMin:
@@ -167,6 +137,11 @@ def summarizeBatch(numTrials, batchNumber, modelsList, outputFile):
         for val in proportionsAbovePF:
             outputFile.write('{0},'.format(val))
         outputFile.write('\n')
+
+        outputFile.write('Unique brackets,')
+        for val in uniqueBrackets:
+            outputFile.write('{0},'.format(val))
+        outputFile.write('\n')
         outputFile.write('\n')
 
 
@@ -174,7 +149,6 @@ def summarizeBatch(numTrials, batchNumber, modelsList, outputFile):
 # runExperiments.py.
 
 espnMin = [1590, 1520, 1760, 1630, 1650, 1550, 1730]
-MEAN_MEDIAN_VAR_CUTOFF = 10001
 
 numTrials = int(sys.argv[1])
 numBatches = int(sys.argv[2])
@@ -203,9 +177,13 @@ else:
 if not os.path.exists(outputDir):
     os.makedirs(outputDir)
 
+catalog = open_catalog()
+
 for batchNumber in range(numBatches):
     outputFilename = '{0}/exp_{1}_batch_{2:02d}.csv'.format(outputDir,
                                                             trialsString,
                                                             batchNumber)
     with open(outputFilename, 'w') as outputFile:
         summarizeBatch(numTrials, batchNumber, modelsList, outputFile)
+
+catalog.close()
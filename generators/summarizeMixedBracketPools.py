@@ -6,10 +6,12 @@ import sys
 from math import log
 from bracketClassDefinitions import Bracket
 from bracketClassDefinitions import Region
-from bracketClassDefinitions import SimpleBracket
 from bracketClassDefinitions import buildBracketFromJson
 from scoringUtils import applyRoundResults
 from scoringUtils import scoreBracket
+from utils.poolStats import summarize_scores
+from utils.experimentCatalog import open_catalog
+from utils.scoreStore import load_scores
 import numpy as np
 
 
@@ -28,44 +30,17 @@ def summarizeBatch(numTrials, batchNumber, modelsFilename, outputFile):
         percentile95 = []
         percentile99 = []
         proportionsAbovePF = []
-
-        if numTrials < MEAN_MEDIAN_VAR_CUTOFF:
-            meanScores = []
-            varianceScores = []
-            medianScores = []
+        meanScores = []
+        varianceScores = []
+        medianScores = []
 
         outputFile.write('{0},'.format(modelsFilename))
 
-        if numTrials < 1000:
-            folderName = 'Experiments/{0}Trials'.format(numTrials)
-        else:
-            folderName = 'Experiments/{0}kTrials'.format(
-                int(numTrials / 1000))
-
-        batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
-        inputFilename = '{2}/generatedScores_{0}Ensemble_{1}.json'.format(
-            modelsFilename, year, batchFolderName)
-
-        with open(inputFilename, 'r') as inputFile:
-            dataPyDict = json.load(inputFile)
-        scores = dataPyDict['scores']
-
-        brackets = []
-        for score in scores:
-            newBracket = SimpleBracket(None, [score])
-            brackets.append(newBracket)
-
-        nBrackets = len(brackets)
-
-        # Determine max scoring bracket, as well as 95/99th percentiles
-        brackets.sort(key=lambda x: x.scores[0], reverse=True)
-        maxScoringBracket = brackets[0]
-        bracket95 = brackets[int(0.05 * nBrackets) - 1]
-        bracket99 = brackets[int(0.01 * nBrackets) - 1]
-
-        # Determine max correct picks
-        # brackets.sort(key=lambda x: x.correctPicks, reverse=True)
-        # maxCorrectPicksBracket = brackets[0]
+        entry = catalog.find(modelsFilename + 'Ensemble', numTrials, year, batchNumber)
+        if entry is None:
+            raise Exception('The ensemble {} for {} (batch {}) was not generated, please execute modelMixer.py'.format(
+                modelsFilename, year, batchNumber))
+        scores, dataPyDict = load_scores(entry['path'])
 
         # Determine score of Pick Favorite model
         actualBracket = dataPyDict['actualBracket']
@@ -78,31 +53,17 @@ def summarizeBatch(numTrials, batchNumber, modelsFilename, outputFile):
                                 True)
         pfTotalScore = pfScores[0]
 
-        bracketsAbovePickFavorite = [b for b in brackets if
-                                     b.scores[0] >= pfTotalScore]
-        nBracketsAbovePF = len(bracketsAbovePickFavorite)
-        proportionAbovePF = nBracketsAbovePF * 1.0 / nBrackets
-
-        bracketsInEspnLeaderboard = [b for b in brackets if
-                                     b.scores[0] >= espnMin[year - 2013]]
-        countAboveEspnMin.append(len(bracketsInEspnLeaderboard))
-
-        if numTrials < MEAN_MEDIAN_VAR_CUTOFF:
-            scores = [x.scores[0] for x in brackets]
-            meanScore = np.mean(scores)
-            varianceScore = np.var(scores)
-            medianScore = np.median(scores)
+        stats = summarize_scores(scores, pfTotalScore, espnMin[year - 2013])
 
-        maxScores.append(maxScoringBracket.scores[0])
+        maxScores.append(stats['max'])
         # maxCorrectPicks.append(maxCorrectPicksBracket.correctPicks)
-        percentile95.append(bracket95.scores[0])
-        percentile99.append(bracket99.scores[0])
-        proportionsAbovePF.append(proportionAbovePF)
-
-        if numTrials < MEAN_MEDIAN_VAR_CUTOFF:
-            meanScores.append(meanScore)
-            varianceScores.append(varianceScore)
-            medianScores.append(medianScore)
+        percentile95.append(stats['percentile95'])
+        percentile99.append(stats['percentile99'])
+        proportionsAbovePF.append(stats['proportionAbovePF'])
+        countAboveEspnMin.append(stats['countAboveEspnMin'])
+        meanScores.append(stats['mean'])
+        varianceScores.append(stats['var'])
+        medianScores.append(stats['median'])
 
         outputFile.write('\n')
 
@@ -111,22 +72,21 @@ def summarizeBatch(numTrials, batchNumber, modelsFilename, outputFile):
             outputFile.write('{0},'.format(maxScores[i]))
         outputFile.write('\n')
 
-        if numTrials < MEAN_MEDIAN_VAR_CUTOFF:
-            outputFile.write('Median score,')
-            for i in range(numModels):
-                outputFile.write('{0},'.format(medianScores[i]))
-            outputFile.write('\n')
+        outputFile.write('Median score,')
+        for i in range(numModels):
+            outputFile.write('{0},'.format(medianScores[i]))
+        outputFile.write('\n')
 
-            outputFile.write('Mean score,')
-            for i in range(numModels):
-                outputFile.write('{0},'.format(meanScores[i]))
-            outputFile.write('')
-            outputFile.write('\n')
+        outputFile.write('Mean score,')
+        for i in range(numModels):
+            outputFile.write('{0},'.format(meanScores[i]))
+        outputFile.write('')
+        outputFile.write('\n')
 
-            outputFile.write('Var(scores),')
-            for i in range(numModels):
-                outputFile.write('{0},'.format(varianceScores[i]))
-            outputFile.write('\n')
+        outputFile.write('Var(scores),')
+        for i in range(numModels):
+            outputFile.write('{0},'.format(varianceScores[i]))
+        outputFile.write('\n')
 
         outputFile.write('No. in ESPN top 100,')
         for i in range(numModels):
@@ -159,7 +119,6 @@ def summarizeBatch(numTrials, batchNumber, modelsFilename, outputFile):
 # runExperiments.py.
 
 espnMin = [1590, 1520, 1760, 1630, 1650, 1550, 1730]
-MEAN_MEDIAN_VAR_CUTOFF = 10001
 
 numTrials = int(sys.argv[1])
 numBatches = int(sys.argv[2])
@@ -189,9 +148,13 @@ else:
 if not os.path.exists(outputDir):
     os.makedirs(outputDir)
 
+catalog = open_catalog()
+
 for batchNumber in range(numBatches):
     outputFilename = '{0}/exp_{1}_batch_{2:02d}.csv'.format(outputDir,
                                                             trialsString,
                                                             batchNumber)
     with open(outputFilename, 'w') as outputFile:
         summarizeBatch(numTrials, batchNumber, ensembleName, outputFile)
+
+catalog.close()
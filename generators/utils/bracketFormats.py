@@ -0,0 +1,91 @@
+__author__ = "Nestor Bermudez"
+__license__ = "MIT"
+__version__ = "1.0.0"
+__email__ = "nab6@illinois.edu"
+__status__ = "Development"
+
+
+import json
+import numpy as np
+import sys
+from utils.bracketPacking import REGION_MASK, region_codes
+from utils.regionTables import CODE_WEIGHTS, FFF_TO_TTT, TTT_TO_FFF
+from utils.regionTables import bracket_region_codes
+
+
+# Only the regional bits depend on the encoding, the Final Four bits
+# are positional (1 means the top team won) in both TTT and FFF.
+TRANSLATION_TABLES = {
+    ('TTT', 'FFF'): TTT_TO_FFF,
+    ('FFF', 'TTT'): FFF_TO_TTT
+}
+
+
+def convert_codes(codes, from_fmt, to_fmt):
+    """
+    Translates region codes from one encoding to another.
+    """
+    if from_fmt == to_fmt:
+        return codes
+    return TRANSLATION_TABLES[(from_fmt, to_fmt)][codes]
+
+
+def convert_brackets(brackets, from_fmt, to_fmt):
+    """
+    Converts a pool of brackets between the TTT and FFF encodings.
+    :param brackets: (N, 63) array of 0s and 1s, a single 63-element
+    vector, or an array of packed brackets (uint64)
+    :return: the converted brackets, with the same shape and type
+    """
+    brackets = np.asarray(brackets)
+    if from_fmt == to_fmt:
+        return brackets.copy()
+    if brackets.dtype == np.uint64:
+        codes = convert_codes(region_codes(brackets), from_fmt, to_fmt)
+        converted = brackets.reshape(-1) & ~np.uint64((1 << 60) - 1)
+        for region in range(4):
+            shift = np.uint64(15 * region)
+            converted |= (codes[:, region].astype(np.uint64) & REGION_MASK) << shift
+        return converted.reshape(brackets.shape)
+
+    codes = convert_codes(bracket_region_codes(brackets), from_fmt, to_fmt)
+    bits = (codes[:, :, np.newaxis] & CODE_WEIGHTS) > 0
+    converted = np.array(brackets, copy=True).reshape(-1, 63)
+    converted[:, :60] = bits.reshape(-1, 60)
+    return converted.reshape(brackets.shape)
+
+
+def convert_vector(vector, from_fmt, to_fmt):
+    """
+    Converts a single bracket given as a '0'/'1' string or a list
+    """
+    converted = convert_brackets(np.array(list(vector), dtype=int), from_fmt, to_fmt)
+    if isinstance(vector, str):
+        return ''.join(converted.astype(str))
+    return converted.tolist()
+
+
+def convert_bracket_file(input_path, output_path, from_fmt, to_fmt):
+    """
+    Converts all the brackets of a file such as allBracketsTTT.json,
+    i.e., the region vectors and the full vector of every year.
+    """
+    with open(input_path) as f:
+        data = json.load(f)
+    full_vectors = np.array([list(bracket['bracket']['fullvector'])
+                             for bracket in data['brackets']], dtype=int)
+    converted = convert_brackets(full_vectors, from_fmt, to_fmt)
+    for bracket, vector in zip(data['brackets'], converted):
+        vector = ''.join(vector.astype(str))
+        bracket['bracket']['fullvector'] = vector
+        for i, region in enumerate(bracket['bracket']['regions']):
+            region['vector'] = vector[i * 15: (i + 1) * 15]
+    with open(output_path, 'w') as f:
+        json.dump(data, f)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 5:
+        print('Usage: python -m utils.bracketFormats <input> <output> <fromFormat> <toFormat>')
+        exit(1)
+    convert_bracket_file(*sys.argv[1:])
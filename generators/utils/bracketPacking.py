@@ -0,0 +1,184 @@
+__author__ = "Nestor Bermudez"
+__license__ = "MIT"
+__version__ = "1.0.0"
+__email__ = "nab6@illinois.edu"
+__status__ = "Development"
+
+
+import json
+import numpy as np
+
+
+# A packed bracket is a single uint64 where bit i holds the outcome of
+# game i of the 63-element vector, i.e., the least significant bit is
+# the first game of the first region and bit 62 is the championship.
+N_GAMES = 63
+SHIFTS = np.arange(N_GAMES, dtype=np.uint64)
+
+REGION_MASK = np.uint64(0x7FFF)
+FINAL_FOUR_SHIFT = np.uint64(60)
+
+# Game indices (within the 63-element vector) played in each round.
+ROUND_GAMES = {
+    1: [region * 15 + i for region in range(4) for i in range(0, 8)],
+    2: [region * 15 + i for region in range(4) for i in range(8, 12)],
+    3: [region * 15 + i for region in range(4) for i in range(12, 14)],
+    4: [region * 15 + 14 for region in range(4)],
+    5: [60, 61],
+    6: [62]
+}
+
+
+def games_mask(games):
+    mask = 0
+    for game in games:
+        mask |= 1 << game
+    return np.uint64(mask)
+
+
+ROUND_MASKS = {r: games_mask(games) for r, games in ROUND_GAMES.items()}
+
+
+def pack_brackets(brackets):
+    """
+    Packs an (N, 63) array of 0s and 1s into an (N,) uint64 array.
+    :param brackets: (N, 63) array-like or a single 63-element vector
+    :return: uint64 array with one element per bracket
+    """
+    brackets = np.asarray(brackets)
+    if brackets.ndim == 1:
+        brackets = brackets.reshape(1, -1)
+    bits = brackets.astype(np.uint64) << SHIFTS
+    return np.bitwise_or.reduce(bits, axis=1)
+
+
+def unpack_brackets(packed, dtype=np.uint8):
+    """
+    Inverse of pack_brackets.
+    :param packed: uint64 scalar or array of packed brackets
+    :return: (N, 63) array of 0s and 1s
+    """
+    packed = np.asarray(packed, dtype=np.uint64).reshape(-1, 1)
+    return ((packed >> SHIFTS) & np.uint64(1)).astype(dtype)
+
+
+def pack_string(vector):
+    """
+    Packs a '0'/'1' string (e.g. a fullvector in allBracketsTTT.json)
+    """
+    return pack_brackets(np.array(list(vector), dtype=int))[0]
+
+
+def unpack_string(packed):
+    return ''.join(unpack_brackets(packed)[0].astype(str))
+
+
+def region_codes(packed):
+    """
+    Extracts the 15-bit code of every region of a pool of packed brackets.
+    :return: (N, 4) array of region codes
+    """
+    packed = np.asarray(packed, dtype=np.uint64).reshape(-1, 1)
+    shifts = np.arange(4, dtype=np.uint64) * np.uint64(15)
+    return ((packed >> shifts) & REGION_MASK).astype(np.int64)
+
+
+def final_four_bits(packed):
+    packed = np.asarray(packed, dtype=np.uint64).reshape(-1, 1)
+    shifts = FINAL_FOUR_SHIFT + np.arange(3, dtype=np.uint64)
+    return ((packed >> shifts) & np.uint64(1)).astype(np.int64)
+
+
+def popcount(values):
+    """
+    Counts the bits set in every element of a uint64 array.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values).astype(np.int64)
+    values = values - ((values >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    values = (values & np.uint64(0x3333333333333333)) + \
+        ((values >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    values = (values + (values >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((values * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
+
+
+def matching_games(packed, actual, mask):
+    """
+    Number of games selected by mask in which each bracket has the same
+    outcome as the actual bracket.
+    """
+    packed = np.asarray(packed, dtype=np.uint64)
+    return popcount(~(packed ^ np.uint64(actual)) & mask)
+
+
+def round1_correct_picks(packed, actual):
+    """
+    Number of correct picks in the first round for each bracket. In the
+    first round the teams are known in advance, so a pick is correct iff
+    its bit matches the actual bit.
+    """
+    return matching_games(packed, actual, ROUND_MASKS[1])
+
+
+def load_packed_brackets(fmt='TTT'):
+    """
+    Reads allBrackets{fmt}.json and returns a dict year -> packed bracket
+    """
+    with open('allBrackets{}.json'.format(fmt)) as f:
+        data = json.load(f)
+    return {int(bracket['bracket']['year']): pack_string(bracket['bracket']['fullvector'])
+            for bracket in data['brackets']}
+
+
+def as_packed(brackets):
+    """
+    Returns the brackets as an (N,) uint64 array, packing them if they
+    are given as an (N, 63) array.
+    """
+    brackets = np.asarray(brackets)
+    if brackets.dtype == np.uint64:
+        return brackets.reshape(-1)
+    return pack_brackets(brackets)
+
+
+def unique_brackets(brackets):
+    """
+    Distinct brackets of a pool.
+    :param brackets: (N, 63) array or (N,) array of packed brackets
+    :return: (unique, inverse, counts) where unique holds the distinct
+    packed brackets, unique[inverse] recovers the pool and counts is the
+    multiplicity of every distinct bracket
+    """
+    return np.unique(as_packed(brackets), return_inverse=True, return_counts=True)
+
+
+def multiplicity_stats(counts):
+    total = counts.sum()
+    frequencies = counts / float(total)
+    return {
+        'unique': int(counts.size),
+        'uniqueFraction': counts.size / float(total),
+        'maxMultiplicity': int(counts.max()),
+        'effectiveSize': float(np.exp(-np.sum(frequencies * np.log(frequencies))))
+    }
+
+
+def pool_diversity(brackets):
+    """
+    Pool-diversity statistic based on duplicate multiplicities. The
+    effective size is the exponential of the entropy of the frequencies
+    of the distinct values, i.e., it equals the pool size when there are
+    no duplicates and 1 when all brackets are the same.
+    :param brackets: (N, 63) array or (N,) array of packed brackets
+    :return: dict with the stats of whole brackets and of every region
+    """
+    packed = as_packed(brackets)
+    _, counts = np.unique(packed, return_counts=True)
+    diversity = multiplicity_stats(counts)
+    diversity['size'] = int(packed.size)
+
+    codes = region_codes(packed)
+    diversity['regions'] = [multiplicity_stats(np.unique(codes[:, region], return_counts=True)[1])
+                            for region in range(4)]
+    return diversity
@@ -8,6 +8,7 @@ __status__ = "Development"
 import json
 import numpy as np
 import os
+from utils.poolStats import histogram_count, histogram_count_above
 
 
 def calculate_tail_p(score, num_trials, year, batch_number, models_path, summary_path):
@@ -25,6 +26,11 @@ def calculate_tail_p(score, num_trials, year, batch_number, models_path, summary
                 'Model stats must be calculated before. Please execute scoresHistogram.py')
         with open('{}/stats/{}/{}_batch{}.json'.format(summary_path, year, name, batch_number)) as f:
             stats = json.load(f)
+        if 'histogram' in stats:
+            # exact proportion of brackets with a score >= score
+            histogram = np.array(stats['histogram'])
+            p.append(histogram_count_above(histogram, score) * 1. / histogram_count(histogram))
+            continue
         percentiles = [0] + stats['percentiles'][1:] + [stats['max'], 1920]
         for i in range(100, -1, -1):
             if score > percentiles[i] and score <= percentiles[i+1]:
@@ -0,0 +1,200 @@
+__author__ = "Nestor Bermudez"
+__license__ = "MIT"
+__version__ = "1.0.0"
+__email__ = "nab6@illinois.edu"
+__status__ = "Development"
+
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+
+# Every (model, year, batch) unit run by the generators is recorded in
+# a SQLite database in the experiments root, with the hash of the model
+# definition, the number of trials, the seed of the unit, where its
+# scores were saved, its runtime and a few summary metrics. The
+# summarizers and the mixer look the scores up in the catalog instead
+# of formatting paths and probing the file system for every model,
+# year and batch. Scores saved without going through the catalog, e.g.
+# by runs that predate it, are indexed with a single scan of the
+# experiments root when the catalog is created (or still empty), or on
+# demand with open_catalog(reindex=True) or python -m
+# utils.experimentCatalog, so opening it does not walk the folders.
+EXPERIMENTS_ROOT = 'Experiments'
+CATALOG_FILENAME = 'catalog.sqlite'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS units (
+    model_name TEXT NOT NULL,
+    trials INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    batch INTEGER NOT NULL,
+    config_hash TEXT,
+    seed INTEGER,
+    path TEXT,
+    format TEXT,
+    histogram INTEGER NOT NULL DEFAULT 0,
+    runtime REAL,
+    metrics TEXT,
+    created TEXT,
+    PRIMARY KEY (model_name, trials, year, batch)
+)
+'''
+
+TRIALS_FOLDER = re.compile(r'^(\d+)(k?)Trials$')
+BATCH_FOLDER = re.compile(r'^Batch(\d+)$')
+SCORES_FILE = re.compile(r'^generatedScores_(.+)_(\d{4})(\.hist\.npy|\.npy|\.json)$')
+
+
+def config_hash(model):
+    """
+    Hash of a model definition, independent of the order of its keys.
+    """
+    return hashlib.sha1(json.dumps(model, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class ExperimentCatalog:
+    def __init__(self, root=EXPERIMENTS_ROOT):
+        self.root = root
+        if not os.path.exists(root):
+            os.makedirs(root)
+        self.connection = sqlite3.connect(os.path.join(root, CATALOG_FILENAME), timeout=60)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def record(self, model_name, trials, year, batch, config=None, seed=None, path=None,
+               fmt=None, histogram=False, runtime=None, metrics=None, commit=True):
+        """
+        Adds a completed unit, replacing a previous run of the same
+        model, number of trials, year and batch.
+        :param config: model definition, only its hash is stored
+        :param path: base name of the scores (see utils/scoreStore.py)
+        :param fmt: format of the scores, 'npy', 'json' or 'hist'
+        :param histogram: whether the 193-bin histogram was saved
+        :param metrics: dict of summary metrics of the pool
+        :param commit: commit right away, so the entry survives a crash
+        """
+        if path is not None:
+            path = os.path.relpath(path, self.root)
+        self.connection.execute(
+            'INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (model_name, trials, year, batch, None if config is None else config_hash(config),
+             seed, path, fmt, int(histogram), runtime,
+             None if metrics is None else json.dumps(metrics),
+             time.strftime('%Y-%m-%d %H:%M:%S')))
+        if commit:
+            self.connection.commit()
+
+    def attach_scores(self, model_name, trials, year, batch, path, fmt, histogram=False, metrics=None):
+        """
+        Sets where the scores of a unit were saved, keeping the rest of
+        its entry, e.g. for scores extracted after the unit was run.
+        """
+        if self.find(model_name, trials, year, batch) is None:
+            self.record(model_name, trials, year, batch, path=path, fmt=fmt,
+                        histogram=histogram, metrics=metrics)
+            return
+        self.connection.execute(
+            'UPDATE units SET path = ?, format = ?, histogram = ?, metrics = ? '
+            'WHERE model_name = ? AND trials = ? AND year = ? AND batch = ?',
+            (os.path.relpath(path, self.root), fmt, int(histogram),
+             None if metrics is None else json.dumps(metrics), model_name, trials, year, batch))
+        self.connection.commit()
+
+    def find(self, model_name, trials, year, batch):
+        """
+        Entry of a unit as a dict (with the path of its scores relative
+        to the working directory), or None if it was never run.
+        """
+        row = self.connection.execute(
+            'SELECT * FROM units WHERE model_name = ? AND trials = ? AND year = ? AND batch = ?',
+            (model_name, trials, year, batch)).fetchone()
+        return None if row is None else self.to_entry(row)
+
+    def units(self, trials=None, model_name=None):
+        """
+        Entries of every unit, optionally of a number of trials or model
+        """
+        query = 'SELECT * FROM units WHERE (? IS NULL OR trials = ?) AND (? IS NULL OR model_name = ?) ' \
+                'ORDER BY model_name, trials, year, batch'
+        rows = self.connection.execute(query, (trials, trials, model_name, model_name))
+        return [self.to_entry(row) for row in rows]
+
+    def to_entry(self, row):
+        entry = dict(zip(row.keys(), row))
+        if entry['path'] is not None:
+            entry['path'] = os.path.join(self.root, entry['path'])
+        entry['histogram'] = bool(entry['histogram'])
+        entry['metrics'] = None if entry['metrics'] is None else json.loads(entry['metrics'])
+        return entry
+
+    def index_existing(self):
+        """
+        Records the scores already saved under the experiments root,
+        e.g. by runs that predate the catalog. Units already in the
+        catalog are left as they are.
+        :return: number of units added
+        """
+        found = {}
+        for trials_folder in os.listdir(self.root):
+            match = TRIALS_FOLDER.match(trials_folder)
+            if match is None:
+                continue
+            trials = int(match.group(1)) * (1000 if match.group(2) else 1)
+            for batch_folder in os.listdir(os.path.join(self.root, trials_folder)):
+                batch_match = BATCH_FOLDER.match(batch_folder)
+                if batch_match is None:
+                    continue
+                folder = os.path.join(self.root, trials_folder, batch_folder)
+                for filename in os.listdir(folder):
+                    file_match = SCORES_FILE.match(filename)
+                    if file_match is None:
+                        continue
+                    key = (file_match.group(1), trials, int(file_match.group(2)), int(batch_match.group(1)))
+                    unit = found.setdefault(key, {'path': os.path.join(folder, filename[:file_match.start(3)]),
+                                                  'fmt': 'hist', 'histogram': False})
+                    if file_match.group(3) == '.hist.npy':
+                        unit['histogram'] = True
+                    else:
+                        unit['fmt'] = file_match.group(3)[1:]
+
+        added = 0
+        for (model_name, trials, year, batch), unit in sorted(found.items()):
+            if self.find(model_name, trials, year, batch) is None:
+                self.record(model_name, trials, year, batch, commit=False, **unit)
+                added += 1
+        self.connection.commit()
+        return added
+
+
+def open_catalog(root=EXPERIMENTS_ROOT, reindex=False):
+    """
+    Opens the catalog of the experiments root, indexing the existing
+    results (see index_existing) if the catalog is new or empty.
+    :param reindex: index the results that are not in the catalog
+    anyway, e.g. batches saved by other means since it was created
+    """
+    catalog = ExperimentCatalog(root)
+    if reindex or catalog.connection.execute('SELECT COUNT(*) FROM units').fetchone()[0] == 0:
+        catalog.index_existing()
+    return catalog
+
+
+if __name__ == '__main__':
+    import sys
+
+    # python -m utils.experimentCatalog [root]
+    # indexes the results saved without the catalog and lists the units
+    catalog = ExperimentCatalog(sys.argv[1] if len(sys.argv) > 1 else EXPERIMENTS_ROOT)
+    print('Indexed {} units'.format(catalog.index_existing()))
+    for entry in catalog.units():
+        print('{model_name} {trials} {year} {batch:02d} {format} {path}'.format(**entry))
+    catalog.close()
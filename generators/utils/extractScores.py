@@ -6,17 +6,24 @@ __status__ = "Development"
 
 
 import json
+from utils.experimentCatalog import open_catalog
+from utils.poolStats import histogram_metrics, score_histogram
+from utils.scoreStore import save_scores, scores_basename
 
 
-def extract_scores(filepath, output):
+def extract_scores(filepath, basename, year):
+    """
+    Saves the total scores of a generatedBrackets file in the binary
+    format of the generated scores (see utils/scoreStore.py).
+    :param basename: path of the scores without extension
+    """
     scores = []
     with open(filepath) as f:
         data = json.load(f)
         for bracket in data['brackets']:
             scores.append(bracket['score'][0])
-        result = {'scores': scores, 'actualBracket': data['actualBracket']}
-    with open(output, 'w') as f:
-        json.dump(result, f)
+    save_scores(basename, scores, year, data['actualBracket'])
+    return scores
 
 
 if __name__ == '__main__':
@@ -34,6 +41,7 @@ if __name__ == '__main__':
 
     numTrials = int(sys.argv[1])
     numBatches = int(sys.argv[2])
+    catalog = open_catalog()
 
     for modelDict in modelsList:
         modelName = modelDict['modelName']
@@ -46,6 +54,9 @@ if __name__ == '__main__':
                     folderName = 'Experiments/{0}kTrials'.format(int(numTrials / 1000))
                 batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
                 rawDataFilepath = '{2}/generatedBrackets_{0}_{1}.json'.format(modelName, year, batchFolderName)
-                scoresFilepath = '{2}/generatedScores_{0}_{1}.json'.format(modelName, year, batchFolderName)
+                basename = scores_basename(batchFolderName, modelName, year)
 
-                extract_scores(rawDataFilepath, scoresFilepath)
+                scores = extract_scores(rawDataFilepath, basename, year)
+                catalog.attach_scores(modelName, numTrials, year, batchNumber, basename,
+                                      'npy', metrics=histogram_metrics(score_histogram(scores)))
+    catalog.close()
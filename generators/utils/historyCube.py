@@ -0,0 +1,225 @@
+__author__ = "Nestor Bermudez"
+__license__ = "MIT"
+__version__ = "1.0.0"
+__email__ = "nab6@illinois.edu"
+__status__ = "Development"
+
+
+import json
+import numpy as np
+from utils.bracketFormats import convert_codes
+from utils.regionTables import GAME_LOSERS, GAME_ROUNDS, GAME_WINNERS
+from utils.regionTables import N_REGION_CODES, bracket_region_codes
+
+
+# Almost every estimate in the generators and analysis scripts uses the
+# brackets of the tournaments before a given year. Instead of filtering
+# and stacking the historical brackets for every year, HistoryCube keeps
+# cumulative counts over the years (row i holds the counts of the first
+# i years), so the counts of any range of years are a subtraction of
+# two rows, and a new tournament only appends one row.
+MAX_SEED = 16
+N_ROUNDS = 6
+
+
+def bracket_matchups(brackets, fmt='TTT'):
+    """
+    Seeds of the winner and loser of every game of a pool of brackets.
+    :param brackets: (N, 63) array of 0s and 1s
+    :param fmt: encoding of the brackets, the regional games are
+    translated to TTT to find the teams
+    :return: (rounds, winners, losers), each one an (N, 63) array
+    """
+    brackets = np.asarray(brackets, dtype=np.int64).reshape(-1, 63)
+    codes = convert_codes(bracket_region_codes(brackets), fmt, 'TTT')
+    winners = np.zeros((brackets.shape[0], 63), dtype=np.int64)
+    losers = np.zeros((brackets.shape[0], 63), dtype=np.int64)
+    for region in range(4):
+        games = slice(15 * region, 15 * (region + 1))
+        winners[:, games] = GAME_WINNERS[codes[:, region]]
+        losers[:, games] = GAME_LOSERS[codes[:, region]]
+
+    # 1 in the Final Four bits means the top team won
+    region_winners = winners[:, [14, 29, 44, 59]]
+    for game, (top, bottom) in zip([60, 61], [(0, 1), (2, 3)]):
+        top_won = brackets[:, game] == 1
+        winners[:, game] = np.where(top_won, region_winners[:, top], region_winners[:, bottom])
+        losers[:, game] = np.where(top_won, region_winners[:, bottom], region_winners[:, top])
+    top_won = brackets[:, 62] == 1
+    winners[:, 62] = np.where(top_won, winners[:, 60], winners[:, 61])
+    losers[:, 62] = np.where(top_won, winners[:, 61], winners[:, 60])
+
+    rounds = np.concatenate([np.tile(GAME_ROUNDS, 4), [5, 5, 6]])
+    return np.broadcast_to(rounds, winners.shape), winners, losers
+
+
+def count_matchup_wins(brackets, fmt='TTT'):
+    """
+    (7, 17, 17) array with the number of times the seed of the second
+    index beat the seed of the third index in every round (1-6) of a
+    pool of brackets.
+    """
+    wins = np.zeros((N_ROUNDS + 1, MAX_SEED + 1, MAX_SEED + 1), dtype=np.int32)
+    rounds, winners, losers = bracket_matchups(brackets, fmt)
+    np.add.at(wins, (rounds.ravel(), winners.ravel(), losers.ravel()), 1)
+    return wins
+
+
+def pattern_codes(values):
+    """
+    Code of every row of a (N, bits) array of 0s and 1s, where the first
+    bit is the most significant one, so sorting the codes sorts the rows
+    the same way np.unique(values, axis=0) does.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    weights = 1 << np.arange(values.shape[1] - 1, -1, -1)
+    return values.dot(weights)
+
+
+def decode_patterns(codes, n_bits):
+    codes = np.asarray(codes, dtype=np.int64)
+    return (codes[:, np.newaxis] >> np.arange(n_bits - 1, -1, -1)) & 1
+
+
+class HistoryCube:
+    def __init__(self, all_brackets, fmt='TTT'):
+        """
+        :param all_brackets: dict year -> 63-element bracket vector
+        :param fmt: encoding of the brackets
+        """
+        self.fmt = fmt
+        self.years = np.zeros(0, dtype=int)
+        self.vectors = np.zeros((0, 63), dtype=np.int8)
+        self.bit_counts = np.zeros((1, 63), dtype=np.int64)
+        self.region_code_counts = np.zeros((1, N_REGION_CODES), dtype=np.int32)
+        self.matchup_wins = np.zeros((1, N_ROUNDS + 1, MAX_SEED + 1, MAX_SEED + 1), dtype=np.int32)
+        # cumulative counts of the groups of bits queried so far, see
+        # pattern_code_counts
+        self.pattern_counts = {}
+        for year in sorted(all_brackets.keys()):
+            self.add_year(year, all_brackets[year])
+
+    def add_year(self, year, vector):
+        """
+        Appends the bracket of a new tournament, which has to be later
+        than every year already in the cube.
+        """
+        if len(self.years) > 0 and year <= self.years[-1]:
+            raise ValueError('Year {} is not after {}'.format(year, self.years[-1]))
+        vector = np.asarray(vector, dtype=np.int8).reshape(1, 63)
+
+        region_counts = np.bincount(bracket_region_codes(vector).ravel(), minlength=N_REGION_CODES)
+        wins = count_matchup_wins(vector, self.fmt)
+
+        self.years = np.append(self.years, year)
+        self.vectors = np.vstack([self.vectors, vector])
+        self.bit_counts = np.vstack([self.bit_counts, self.bit_counts[-1] + vector])
+        self.region_code_counts = np.vstack([self.region_code_counts, self.region_code_counts[-1] + region_counts])
+        self.matchup_wins = np.concatenate([self.matchup_wins, self.matchup_wins[-1:] + wins])
+        for bits, counts in self.pattern_counts.items():
+            row = counts[-1].copy()
+            row[pattern_codes(vector[:, list(bits)])[0]] += 1
+            self.pattern_counts[bits] = np.vstack([counts, row])
+
+    def index(self, year):
+        """
+        Number of tournaments before the given year, i.e., the row of the
+        cumulative counts with the data before the year.
+        """
+        return int(np.searchsorted(self.years, year, side='left'))
+
+    def window(self, start=None, limit=None):
+        """
+        Rows of the cumulative counts of the tournaments with
+        start <= year < limit. Either bound may be None.
+        """
+        first = 0 if start is None else self.index(start)
+        last = len(self.years) if limit is None else self.index(limit)
+        return first, max(first, last)
+
+    def count(self, limit=None, start=None):
+        first, last = self.window(start, limit)
+        return last - first
+
+    def vectors_before(self, limit, start=None):
+        """
+        (N, 63) view of the brackets of the tournaments before limit,
+        ordered by year.
+        """
+        first, last = self.window(start, limit)
+        return self.vectors[first:last]
+
+    def bit_counts_before(self, limit, start=None):
+        first, last = self.window(start, limit)
+        return self.bit_counts[last] - self.bit_counts[first]
+
+    def bit_probs_before(self, limit, start=None):
+        """
+        MLE of P(bit = 1) of every bit with the tournaments before limit
+        """
+        return 1. * self.bit_counts_before(limit, start) / self.count(limit, start)
+
+    def region_code_counts_before(self, limit, start=None):
+        """
+        Number of times each of the 2^15 region outcomes happened in the
+        tournaments before limit, pooling the four regions.
+        """
+        first, last = self.window(start, limit)
+        return self.region_code_counts[last] - self.region_code_counts[first]
+
+    def pattern_code_counts(self, bits):
+        """
+        Cumulative counts of every value of a group of bits (see
+        pattern_codes), one row per year as the other counts. They are
+        computed the first time the group is queried and kept up to date
+        by add_year.
+        :return: (years + 1, 2^len(bits)) array
+        """
+        bits = tuple(int(bit) for bit in bits)
+        if bits not in self.pattern_counts:
+            counts = np.zeros((len(self.years) + 1, 2 ** len(bits)), dtype=np.int64)
+            counts[np.arange(1, len(self.years) + 1), pattern_codes(self.vectors[:, list(bits)])] = 1
+            self.pattern_counts[bits] = np.cumsum(counts, axis=0)
+        return self.pattern_counts[bits]
+
+    def pattern_counts_before(self, bits, limit, start=None, pooled=False):
+        """
+        Distinct values of a group of bits and their counts in the
+        tournaments before limit, the same result as
+        np.unique(vectors[:, bits], axis=0, return_counts=True).
+        :param bits: positions of the bits in the bracket, or in the
+        region if pooled
+        :param pooled: count the pattern in the four regions (bits < 15)
+        :return: (values, counts), values is a (k, len(bits)) array
+        """
+        bits = np.asarray(bits, dtype=int)
+        if pooled:
+            region_counts = self.region_code_counts_before(limit, start)
+            region_codes = np.flatnonzero(region_counts)
+            values = (region_codes[:, np.newaxis] >> bits) & 1
+            counts = np.bincount(pattern_codes(values), weights=region_counts[region_codes],
+                                 minlength=2 ** len(bits))
+        else:
+            first, last = self.window(start, limit)
+            pattern_counts = self.pattern_code_counts(bits)
+            counts = pattern_counts[last] - pattern_counts[first]
+        codes = np.flatnonzero(counts)
+        return decode_patterns(codes, len(bits)), counts[codes].astype(np.int64)
+
+    def matchup_wins_before(self, limit, start=None):
+        """
+        Matchup wins (see count_matchup_wins) of the tournaments before limit
+        """
+        first, last = self.window(start, limit)
+        return self.matchup_wins[last] - self.matchup_wins[first]
+
+
+def load_history(fmt='TTT', path=None):
+    """
+    Builds the cube of allBrackets{fmt}.json
+    """
+    with open(path or 'allBrackets{}.json'.format(fmt)) as f:
+        data = json.load(f)
+    all_brackets = {int(bracket['bracket']['year']): np.array(list(bracket['bracket']['fullvector']), dtype=int)
+                    for bracket in data['brackets']}
+    return HistoryCube(all_brackets, fmt)
@@ -0,0 +1,191 @@
+__author__ = "Nestor Bermudez"
+__license__ = "MIT"
+__version__ = "1.0.0"
+__email__ = "nab6@illinois.edu"
+__status__ = "Development"
+
+
+import numpy as np
+
+
+# ESPN scores are multiples of 10 between 0 and 1920, so the score
+# distribution of a pool is fully described by the number of brackets
+# with each of the 193 possible scores. The statistics below are
+# computed from these counts in O(193) regardless of the size of the
+# pool, and the histograms of several batches can be summed exactly.
+SCORE_STEP = 10
+MAX_SCORE = 1920
+N_SCORE_BINS = MAX_SCORE // SCORE_STEP + 1
+BIN_SCORES = np.arange(N_SCORE_BINS) * SCORE_STEP
+
+
+def score_histogram(scores):
+    """
+    Number of brackets with every possible score.
+    :param scores: list or array with the score of every bracket
+    :return: array of N_SCORE_BINS int64 counts, bin i counts score 10 * i
+    """
+    scores = np.asarray(scores, dtype=np.int64)
+    if np.any(scores % SCORE_STEP != 0) or np.any(scores < 0) or np.any(scores > MAX_SCORE):
+        raise ValueError('Scores must be multiples of {} in [0, {}]'.format(SCORE_STEP, MAX_SCORE))
+    return np.bincount(scores // SCORE_STEP, minlength=N_SCORE_BINS).astype(np.int64)
+
+
+def histogram_count(histogram):
+    return int(np.sum(histogram))
+
+
+def histogram_values(histogram, positions):
+    """
+    Scores at the given positions of the pool sorted in ascending order,
+    e.g. position 0 is the min score.
+    """
+    cumulative = np.cumsum(histogram)
+    bins = np.searchsorted(cumulative, np.asarray(positions), side='right')
+    return BIN_SCORES[bins]
+
+
+def histogram_max(histogram):
+    return int(BIN_SCORES[np.flatnonzero(histogram)[-1]])
+
+
+def histogram_min(histogram):
+    return int(BIN_SCORES[np.flatnonzero(histogram)[0]])
+
+
+def histogram_mean(histogram):
+    return float(np.dot(histogram, BIN_SCORES)) / histogram_count(histogram)
+
+
+def histogram_var(histogram, ddof=0):
+    """
+    Variance of the scores, the same as np.var(scores, ddof=ddof)
+    """
+    deviations = BIN_SCORES - histogram_mean(histogram)
+    return float(np.dot(histogram, deviations ** 2)) / (histogram_count(histogram) - ddof)
+
+
+def histogram_percentiles(histogram, q):
+    """
+    Percentiles of the scores with linear interpolation, the same as
+    np.percentile(scores, q).
+    """
+    positions = np.asarray(q, dtype=float) / 100. * (histogram_count(histogram) - 1)
+    below = np.floor(positions).astype(np.int64)
+    above = np.ceil(positions).astype(np.int64)
+    low = histogram_values(histogram, below)
+    high = histogram_values(histogram, above)
+    return low + (high - low) * (positions - below)
+
+
+def histogram_median(histogram):
+    return float(histogram_percentiles(histogram, 50))
+
+
+def top_position(n, proportion):
+    """
+    Position, in the pool sorted in ascending order, of the bracket
+    ranked int(proportion * n) in descending order, e.g. 0.05 gives the
+    95th percentile bracket. As with a sorted list, a rank of 0 wraps
+    around to the min score.
+    """
+    rank = int(proportion * n)
+    return n - rank if rank > 0 else 0
+
+
+def histogram_top(histogram, proportion):
+    """
+    Score of the bracket ranked int(proportion * n) in the pool sorted
+    in descending order (see top_position).
+    """
+    return int(histogram_values(histogram, top_position(histogram_count(histogram), proportion)))
+
+
+def histogram_count_above(histogram, score):
+    """
+    Number of brackets with a score >= the given score
+    """
+    first_bin = max(0, -(-int(score) // SCORE_STEP))
+    return int(np.sum(histogram[first_bin:]))
+
+
+def histogram_boxplot_stats(histogram, whis=1.5):
+    """
+    Same statistics as matplotlib.cbook.boxplot_stats(scores)[0], with
+    the fliers in ascending order.
+    """
+    n = histogram_count(histogram)
+    q1, med, q3 = histogram_percentiles(histogram, [25, 50, 75])
+    iqr = q3 - q1
+    stats = {'mean': histogram_mean(histogram), 'med': med, 'q1': q1, 'q3': q3, 'iqr': iqr,
+             'cilo': med - 1.57 * iqr / np.sqrt(n), 'cihi': med + 1.57 * iqr / np.sqrt(n)}
+
+    present = BIN_SCORES[histogram > 0]
+    below_high = present[present <= q3 + whis * iqr]
+    above_low = present[present >= q1 - whis * iqr]
+    stats['whishi'] = q3 if len(below_high) == 0 or below_high.max() < q3 else below_high.max()
+    stats['whislo'] = q1 if len(above_low) == 0 or above_low.min() > q1 else above_low.min()
+
+    fliers = (BIN_SCORES < stats['whislo']) | (BIN_SCORES > stats['whishi'])
+    stats['fliers'] = np.repeat(BIN_SCORES[fliers], histogram[fliers])
+    return stats
+
+
+def histogram_metrics(histogram):
+    """
+    Statistics of a pool that do not depend on the actual bracket, e.g.
+    for the experiment catalog (see utils/experimentCatalog.py).
+    """
+    return {
+        'count': histogram_count(histogram),
+        'max': histogram_max(histogram),
+        'min': histogram_min(histogram),
+        'mean': histogram_mean(histogram),
+        'var': histogram_var(histogram),
+        'median': histogram_median(histogram)
+    }
+
+
+# Both summaries return the statistics of the CSV files written by
+# summarizeBracketPools.py. The 95th and 99th percentiles are the scores
+# of the brackets ranked int(0.05 * n) and int(0.01 * n) in the pool
+# sorted in descending order.
+def summarize_histogram(histogram, pf_score, espn_min):
+    n = histogram_count(histogram)
+    return {
+        'count': n,
+        'max': histogram_max(histogram),
+        'min': histogram_min(histogram),
+        'mean': histogram_mean(histogram),
+        'var': histogram_var(histogram),
+        'median': histogram_median(histogram),
+        'percentile95': histogram_top(histogram, 0.05),
+        'percentile99': histogram_top(histogram, 0.01),
+        'countAboveEspnMin': histogram_count_above(histogram, espn_min),
+        'proportionAbovePF': histogram_count_above(histogram, pf_score) * 1.0 / n
+    }
+
+
+def summarize_scores(scores, pf_score, espn_min):
+    """
+    Same statistics as summarize_histogram, from the scores of the pool.
+    A single np.partition places every order statistic that is needed,
+    instead of sorting the whole pool.
+    """
+    scores = np.asarray(scores, dtype=np.int64)
+    n = scores.size
+    p95, p99 = top_position(n, 0.05), top_position(n, 0.01)
+    positions = sorted({0, n - 1, (n - 1) // 2, n // 2, p95, p99})
+    ordered = np.partition(scores, positions)
+    return {
+        'count': n,
+        'max': ordered[n - 1],
+        'min': ordered[0],
+        'mean': scores.mean(),
+        'var': scores.var(),
+        'median': np.mean(ordered[[(n - 1) // 2, n // 2]]),
+        'percentile95': ordered[p95],
+        'percentile99': ordered[p99],
+        'countAboveEspnMin': np.count_nonzero(scores >= espn_min),
+        'proportionAbovePF': np.count_nonzero(scores >= pf_score) * 1.0 / n
+    }
@@ -6,6 +6,7 @@ __status__ = "Development"
 
 
 import pandas as pd
+from utils.regionTables import CODE_WEIGHTS, GAME_LOSERS, GAME_WINNERS
 from triplets.priors.PriorDistributions import read_data
 
 
@@ -24,18 +25,20 @@ def preprocess(year):
     counter = 0
     f4Seeds = []
 
+    # winners/losers of the 15 games of every pooled region in one gather
+    codes = data[:, :15].dot(CODE_WEIGHTS)
+    all_winners = GAME_WINNERS[codes]
+    all_losers = GAME_LOSERS[codes]
+
     for row_i in range(data.shape[0]):
-        row = data[row_i, :]
-        seeds = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-        winning_seed = -1
-        for i, bit in enumerate(row):
-            matchup = seeds[i * 2], seeds[i * 2 + 1]
-            winning_seed = matchup[1 - bit]
-            seeds.append(winning_seed)
+        winners, losers = all_winners[row_i], all_losers[row_i]
+        for winner, loser in zip(winners, losers):
+            low, high = min(winner, loser), max(winner, loser)
             records.append([
-                's{}'.format(min(matchup)),
-                's{}'.format(max(matchup)),
-                'W{}'.format(1 if winning_seed == min(matchup) else 2)])
+                's{}'.format(low),
+                's{}'.format(high),
+                'W{}'.format(1 if winner == low else 2)])
+        winning_seed = int(winners[14])
 
         f4Seeds.append(winning_seed)
         if len(f4Seeds) == 4:
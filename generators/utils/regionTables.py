@@ -0,0 +1,88 @@
+__author__ = "Nestor Bermudez"
+__license__ = "MIT"
+__version__ = "1.0.0"
+__email__ = "nab6@illinois.edu"
+__status__ = "Development"
+
+
+import numpy as np
+
+
+# Every region has 15 games, so there are only 2^15 possible outcomes.
+# These tables are indexed by the 15-bit region code, where bit i of the
+# code is the outcome of game i of the region (see utils/bracketPacking.py)
+# and hold the seed that won (or lost) each of the 15 games.
+REGION_SEEDS = np.array([1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15])
+N_REGION_CODES = 2 ** 15
+CODE_WEIGHTS = 1 << np.arange(15)
+
+# Games of the region played in each round
+ROUND_SLICES = {
+    1: slice(0, 8),
+    2: slice(8, 12),
+    3: slice(12, 14),
+    4: slice(14, 15)
+}
+GAME_ROUNDS = np.array([1] * 8 + [2] * 4 + [3] * 2 + [4])
+
+
+def build_tables():
+    codes = np.arange(N_REGION_CODES)
+    bits = (codes[:, np.newaxis] >> np.arange(15)) & 1
+    winners = np.zeros((N_REGION_CODES, 15), dtype=np.int8)
+    losers = np.zeros((N_REGION_CODES, 15), dtype=np.int8)
+
+    seeds = np.tile(REGION_SEEDS, (N_REGION_CODES, 1))
+    start = 0
+    while seeds.shape[1] > 1:
+        n_games = seeds.shape[1] // 2
+        results = bits[:, start:start + n_games] == 1
+        top, bottom = seeds[:, 0::2], seeds[:, 1::2]
+        winners[:, start:start + n_games] = np.where(results, top, bottom)
+        losers[:, start:start + n_games] = np.where(results, bottom, top)
+        seeds = winners[:, start:start + n_games]
+        start += n_games
+    return winners, losers
+
+
+GAME_WINNERS, GAME_LOSERS = build_tables()
+ROUND_WINNERS = {r: GAME_WINNERS[:, s] for r, s in ROUND_SLICES.items()}
+E8_SEEDS = GAME_WINNERS[:, 12:14]
+REGION_WINNERS = GAME_WINNERS[:, 14]
+
+
+def region_code(region_vector):
+    """
+    15-bit code of a single region given as a 15-element vector of 0s and 1s
+    """
+    return int(np.dot(np.asarray(region_vector, dtype=np.int64)[:15], CODE_WEIGHTS))
+
+
+def bracket_region_codes(brackets):
+    """
+    Region codes of a pool of brackets.
+    :param brackets: (N, 63) array (or a single 63-element vector)
+    :return: (N, 4) array of region codes
+    """
+    brackets = np.asarray(brackets, dtype=np.int64)
+    if brackets.ndim == 1:
+        brackets = brackets.reshape(1, -1)
+    regions = brackets[:, :60].reshape(-1, 4, 15)
+    return regions.dot(CODE_WEIGHTS)
+
+
+def build_format_tables():
+    """
+    Translation tables between the region codes of the two encodings.
+    In TTT a 1 means the top team of the game won, whereas in FFF a 1
+    means the favorite (lower seed) won.
+    :return: (ttt_to_fff, fff_to_ttt) arrays with 2^15 codes each
+    """
+    favorite_won = GAME_WINNERS < GAME_LOSERS
+    ttt_to_fff = favorite_won.astype(np.int64).dot(CODE_WEIGHTS)
+    fff_to_ttt = np.zeros(N_REGION_CODES, dtype=np.int64)
+    fff_to_ttt[ttt_to_fff] = np.arange(N_REGION_CODES)
+    return ttt_to_fff, fff_to_ttt
+
+
+TTT_TO_FFF, FFF_TO_TTT = build_format_tables()
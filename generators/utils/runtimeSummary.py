@@ -11,6 +11,8 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 from collections import defaultdict
+from utils.regionTables import GAME_WINNERS, ROUND_SLICES
+from utils.regionTables import bracket_region_codes
 
 
 plt.style.use('seaborn-white')
@@ -61,64 +63,61 @@ class RuntimeSummary:
         }
 
     def analyze_bracket(self, bracket):
-        self.stats['count'] += 1
-        self.stats['bit_count'] += bracket
-        regions = bracket[:60].reshape(-1, 15)
+        self.analyze_batch(np.asarray(bracket).reshape(1, 63))
+
+    def analyze_batch(self, brackets):
+        """
+        Adds a whole pool of brackets to the summary.
+        :param brackets: (N, 63) array of 0s and 1s
+        """
+        brackets = np.asarray(brackets).reshape(-1, 63)
+        self.stats['count'] += brackets.shape[0]
+        self.stats['bit_count'] += brackets.sum(axis=0)
+
+        # the value of every triplet of every region as a code
+        # (first bit is the most significant one)
+        regions = brackets[:, :60].reshape(-1, 15).astype(np.int64)
         for triplet_name, bits in all_triplets.items():
-            triplets, counts = np.unique(regions[:, bits], axis=0, return_counts=True)
-            for t, c in zip(triplets, counts):
-                self.stats['triplets'][triplet_name][''.join(t.astype(str))] += c
-
-        f4 = []
-        for region in range(4):
-            round_id = 1
-            seeds = [1, 16, 8, 9, 5, 12, 4, 13, 6, 11, 3, 14, 7, 10, 2, 15]
-            bits = bracket[region * 15:region * 15 + 15]
-            for i, bit in enumerate(bits[:8]):
-                self.stats['seed_dist']['R1'][seeds[i * 2 + (1 - bit)]] += 1
-            while len(seeds) > 1:
-                new_seeds = []
-                n_games = len(seeds) // 2
-                for game in range(n_games):
-                    if bits[game] == 1:
-                        new_seeds.append(seeds[game * 2])
-                    else:
-                        new_seeds.append(seeds[game * 2 + 1])
-                seeds = new_seeds
-                bits = bits[n_games:]
-                if len(seeds) == 1:
-                    self.stats['seed_dist']['F4'][seeds[0]] += 1
-                elif len(seeds) == 2:
-                    self.stats['seed_dist']['E8'][seeds[0]] += 1
-                    self.stats['seed_dist']['E8'][seeds[1]] += 1
-                elif len(seeds) == 4:
-                    for seed in seeds:
-                        self.stats['seed_dist']['R3'][seed] += 1
-                elif len(seeds) == 8:
-                    for seed in seeds:
-                        self.stats['seed_dist']['R2'][seed] += 1
-
-            f4.append(seeds[0])
-
-        # print(f4)
-
-        ncg = []
-        if bracket[-3] == 1:
-            self.stats['seed_dist']['NCG'][f4[0]] += 1
-            ncg.append(f4[0])
-        else:
-            self.stats['seed_dist']['NCG'][f4[1]] += 1
-            ncg.append(f4[1])
-
-        if bracket[-2] == 1:
-            self.stats['seed_dist']['NCG'][f4[2]] += 1
-            ncg.append(f4[2])
-        else:
-            self.stats['seed_dist']['NCG'][f4[3]] += 1
-            ncg.append(f4[3])
-        champ = ncg[1 - bracket[-1]]
-
-        self.stats['seed_dist']['Champ'][champ] += 1
+            weights = 1 << np.arange(len(bits) - 1, -1, -1)
+            counts = np.bincount(regions[:, bits].dot(weights), minlength=2 ** len(bits))
+            for code in np.flatnonzero(counts):
+                self.stats['triplets'][triplet_name][np.binary_repr(code, len(bits))] += int(counts[code])
+
+        # seeds that won each of the 15 games of every region
+        winners = GAME_WINNERS[bracket_region_codes(brackets)]
+        f4 = winners[:, :, 14].astype(np.int64)
+        ncg = np.stack([np.where(brackets[:, -3] == 1, f4[:, 0], f4[:, 1]),
+                        np.where(brackets[:, -2] == 1, f4[:, 2], f4[:, 3])], axis=1)
+        champ = np.where(brackets[:, -1] == 1, ncg[:, 0], ncg[:, 1])
+        seeds = {
+            'R1': winners[:, :, ROUND_SLICES[1]],
+            'R2': winners[:, :, ROUND_SLICES[1]],
+            'R3': winners[:, :, ROUND_SLICES[2]],
+            'E8': winners[:, :, ROUND_SLICES[3]],
+            'F4': f4,
+            'NCG': ncg,
+            'Champ': champ
+        }
+        for key, values in seeds.items():
+            counts = np.bincount(np.ravel(values), minlength=17)
+            for seed in np.flatnonzero(counts):
+                self.stats['seed_dist'][key][int(seed)] += int(counts[seed])
+
+    def merge(self, other):
+        """
+        Adds the counts of another summary (e.g., of another chunk or
+        worker) to this one. Summaries read with from_file have string
+        seeds, so the seeds are converted back to int.
+        """
+        self.stats['count'] += other.stats['count']
+        self.stats['bit_count'] += np.asarray(other.stats['bit_count'])
+        for triplet_name, counts in other.stats['triplets'].items():
+            for t, c in counts.items():
+                self.stats['triplets'][triplet_name][t] += c
+        for key, counts in other.stats['seed_dist'].items():
+            for seed, c in counts.items():
+                self.stats['seed_dist'][key][int(seed)] += c
+        return self
 
     def to_json(self, filepath):
         with open(filepath, 'w') as f:
@@ -184,8 +183,7 @@ def observed_dist():
     vectors = [list(b['bracket']['fullvector'])
                for b in data]
     vectors = np.array(vectors, dtype=int)
-    for vector in vectors:
-        summary.analyze_bracket(vector)
+    summary.analyze_batch(vectors)
     df = pd.DataFrame.from_dict(summary.stats['seed_dist'])
     df = df[['R2', 'R3', 'E8', 'F4', 'NCG', 'Champ']]
     df = df.fillna(0).astype(int)
@@ -0,0 +1,94 @@
+__author__ = "Nestor Bermudez"
+__license__ = "MIT"
+__version__ = "1.0.0"
+__email__ = "nab6@illinois.edu"
+__status__ = "Development"
+
+
+import json
+import numpy as np
+import os.path
+from utils.poolStats import score_histogram
+
+
+# The scores of a pool are stored either as the original JSON document
+# ({'year', 'actualBracket', 'scores'}) or as a uint16 .npy array (ESPN
+# scores are at most 1920) next to a small JSON sidecar with the year
+# and the actual bracket. Both share the same base name, e.g.
+# Experiments/1kTrials/Batch00/generatedScores_power_2018 + '.json' or
+# + '.npy' and '.meta.json', and load_scores reads whichever exists.
+# The 193-bin histogram of the scores (see utils/poolStats.py) can be
+# saved alongside or instead of them in + '.hist.npy', which has the
+# same size for any number of trials.
+SCORE_DTYPE = np.uint16
+FORMATS = ['npy', 'json', 'hist']
+
+
+def scores_basename(batch_folder, model_name, year):
+    return '{2}/generatedScores_{0}_{1}'.format(model_name, year, batch_folder)
+
+
+def save_scores(basename, scores, year, actual_bracket, fmt='npy'):
+    """
+    Writes the scores of a pool.
+    :param basename: path without extension (see scores_basename)
+    :param scores: list or array with the score of every bracket
+    :param actual_bracket: '0'/'1' string of the actual tournament
+    :param fmt: 'npy', 'json' (the original format) or 'hist' (only
+    the histogram)
+    """
+    if fmt == 'hist':
+        save_histogram(basename, score_histogram(scores), year, actual_bracket)
+    elif fmt == 'json':
+        with open(basename + '.json', 'w') as f:
+            json.dump({'year': year, 'actualBracket': actual_bracket,
+                       'scores': np.asarray(scores).tolist()}, f)
+    elif fmt == 'npy':
+        scores = np.asarray(scores, dtype=SCORE_DTYPE)
+        np.save(basename + '.npy', scores)
+        with open(basename + '.meta.json', 'w') as f:
+            json.dump({'year': year, 'actualBracket': actual_bracket, 'count': int(scores.size)}, f)
+    else:
+        raise ValueError('Unknown score format: {}'.format(fmt))
+
+
+def save_histogram(basename, histogram, year, actual_bracket):
+    histogram = np.asarray(histogram, dtype=np.int64)
+    np.save(basename + '.hist.npy', histogram)
+    with open(basename + '.meta.json', 'w') as f:
+        json.dump({'year': year, 'actualBracket': actual_bracket, 'count': int(histogram.sum())}, f)
+
+
+def load_scores(basename, mmap=True):
+    """
+    Reads the scores of a pool in either format.
+    :param mmap: memory-map the .npy file instead of reading it
+    :return: (scores, meta), scores is a 1-d array and meta a dict with
+    the year and actualBracket
+    """
+    if os.path.exists(basename + '.npy'):
+        scores = np.load(basename + '.npy', mmap_mode='r' if mmap else None)
+        with open(basename + '.meta.json') as f:
+            meta = json.load(f)
+        return scores, meta
+
+    with open(basename + '.json') as f:
+        data = json.load(f)
+    scores = np.array(data.pop('scores'))
+    return scores, data
+
+
+def load_histogram(basename):
+    """
+    Reads the histogram of the scores of a pool, or computes it from the
+    scores if only they were saved.
+    :return: (histogram, meta), see load_scores
+    """
+    if os.path.exists(basename + '.hist.npy'):
+        histogram = np.load(basename + '.hist.npy')
+        with open(basename + '.meta.json') as f:
+            meta = json.load(f)
+        return histogram, meta
+
+    scores, meta = load_scores(basename)
+    return score_histogram(scores), meta
@@ -12,6 +12,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import seaborn as sns
+from utils.historyCube import load_history
 
 
 plt.style.use('seaborn-white')
@@ -31,12 +32,6 @@ all_triplets = {
 }
 
 
-def load_brackets(fmt='TTT'):
-    with open('allBrackets{}.json'.format(fmt)) as f:
-        brackets = json.load(f)['brackets']
-        return brackets
-
-
 def pool_dist(filepath, key):
     with open(filepath) as f:
         data = json.load(f)
@@ -47,13 +42,8 @@ def pool_dist(filepath, key):
         return d
 
 
-def observed_dist(year, key, brackets):
-    vectors = [list(bracket['bracket']['fullvector'])
-               for bracket in brackets
-               if int(bracket['bracket']['year']) < year]
-    vectors = np.array(vectors, dtype=int)
-    vectors = vectors[:, :60].reshape(-1, 15)
-    triplets, counts = np.unique(vectors[:, all_triplets[key]], axis=0, return_counts=True)
+def observed_dist(year, key, history):
+    triplets, counts = history.pattern_counts_before(all_triplets[key], year, pooled=True)
     triplets = np.apply_along_axis(''.join, 1, triplets.astype(str))
     d = {t: c for t, c in zip(triplets, counts)}
     for t in ['000', '001', '010', '011', '100', '101', '110', '111']:
@@ -62,13 +52,9 @@ def observed_dist(year, key, brackets):
     return d
 
 
-def region_bit_dist(filepath, year, brackets):
-    vectors = [list(bracket['bracket']['fullvector'])
-               for bracket in brackets
-               if int(bracket['bracket']['year']) < year]
-    vectors = np.array(vectors, dtype=int)
-    vectors = vectors[:, :60].reshape(-1, 15)
-    observed = np.mean(vectors, axis=0)
+def region_bit_dist(filepath, year, history):
+    bit_counts = history.bit_counts_before(year)[:60].reshape(-1, 15).sum(axis=0)
+    observed = 1. * bit_counts / (history.count(year) * 4)
 
     with open(filepath) as f:
         data = json.load(f)
@@ -82,7 +68,7 @@ if __name__ == '__main__':
     models_filepath = sys.argv[1]
     output = sys.argv[2]
 
-    brackets = load_brackets()
+    history = load_history()
 
     with open(models_filepath) as f:
         models = json.load(f)['models']
@@ -94,7 +80,7 @@ if __name__ == '__main__':
             filepath = 'Experiments/10kTrials/Batch00/vectorStats_{}_{}.json'.format(model['modelName'], year)
             for name, triplet in all_triplets.items():
                 pool = pool_dist(filepath, name)
-                observed = observed_dist(year, name, brackets)
+                observed = observed_dist(year, name, history)
 
                 df = pd.DataFrame.from_dict({'From Simulation': pool, 'Observed': observed})
                 df = df / df.sum(axis=0)
@@ -107,7 +93,7 @@ if __name__ == '__main__':
                 plt.close()
                 # plt.show()
 
-            pool, observed = region_bit_dist(filepath, year, brackets)
+            pool, observed = region_bit_dist(filepath, year, history)
             df = pd.DataFrame.from_dict({'From Simulation': pool, 'Observed': observed})
             df.plot.bar(rot=0)
             plt.title('Dist of region bits - {} - {}'.format(model['modelName'], year))
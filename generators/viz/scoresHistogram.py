@@ -9,11 +9,15 @@ import json
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
-import matplotlib.cbook as cbook
 import numpy as np
 import os
 import seaborn as sns
 import sys
+from utils.poolStats import BIN_SCORES, histogram_boxplot_stats, histogram_max
+from utils.poolStats import histogram_mean, histogram_median, histogram_min
+from utils.poolStats import histogram_percentiles, histogram_var
+from utils.experimentCatalog import open_catalog
+from utils.scoreStore import load_histogram
 
 sns.set_palette('dark')
 plt.style.use('seaborn-white')
@@ -33,39 +37,42 @@ def makedirs(summary_path, year):
         os.makedirs('{}/stats/{}'.format(summary_path, year))
 
 
-def analyze(summary_path, name, num_trials, batchNumber, year):
-    makedirs(summary_path, year)
-
-    if num_trials < 1000:
-        folderName = 'Experiments/{0}Trials'.format(num_trials)
-    else:
-        folderName = 'Experiments/{0}kTrials'.format(int(num_trials / 1000))
-    batchFolderName = '{0}/Batch{1:02d}'.format(folderName, batchNumber)
-    scores_path = '{2}/generatedScores_{0}_{1}.json'.format(name, year, batchFolderName)
+def analyze(summary_path, name, num_trials, batchNumber, year, catalog=None):
+    if catalog is None:
+        catalog = open_catalog()
+        try:
+            return analyze(summary_path, name, num_trials, batchNumber, year, catalog)
+        finally:
+            catalog.close()
+    entry = catalog.find(name, num_trials, year, batchNumber)
+    if entry is None or entry['path'] is None:
+        print('No scores of {} for {} (batch {})'.format(name, year, batchNumber))
+        return
 
-    with open(scores_path) as f:
-        data = json.load(f)
-    scores = data['scores']
+    makedirs(summary_path, year)
+    histogram, _ = load_histogram(entry['path'])
 
+    # the statistics and the plots only need the 193 score counts
     stats = dict()
-    stats['mean'] = np.mean(scores)
-    stats['s'] = np.std(scores, ddof=1)
-    stats['percentiles'] = np.percentile(scores, q=np.arange(0, 100)).tolist()
-    stats['fine-percentiles'] = np.percentile(scores, q=np.arange(99, 100, 0.01)).tolist()
-    stats['max'] = np.max(scores)
-    stats['min'] = np.min(scores)
-    stats['median'] = np.median(scores)
-    stats['bxp'] = cbook.boxplot_stats(scores)[0]
+    stats['mean'] = histogram_mean(histogram)
+    stats['s'] = np.sqrt(histogram_var(histogram, ddof=1))
+    stats['percentiles'] = histogram_percentiles(histogram, q=np.arange(0, 100)).tolist()
+    stats['fine-percentiles'] = histogram_percentiles(histogram, q=np.arange(99, 100, 0.01)).tolist()
+    stats['max'] = histogram_max(histogram)
+    stats['min'] = histogram_min(histogram)
+    stats['median'] = histogram_median(histogram)
+    stats['bxp'] = histogram_boxplot_stats(histogram)
     stats['bxp']['fliers'] = stats['bxp']['fliers'].tolist()
+    stats['histogram'] = histogram.tolist()
 
     with open('{0}/stats/{3}/{1}_batch{2}.json'.format(summary_path, name, batchNumber, year), 'w') as f:
         json.dump(stats, f)
 
-    _, counts = np.unique(scores, return_counts=True)
-    y_max = np.max(counts)
-    bins = (np.max(scores) - np.min(scores)) / 10
+    y_max = np.max(histogram)
+    bins = (stats['max'] - stats['min']) / 10
 
-    sns.distplot(scores, kde=False, bins=bins)
+    sns.distplot(BIN_SCORES, kde=False, bins=bins,
+                 hist_kws=dict(weights=histogram, range=(stats['min'], stats['max'])))
     plt.title('Score distribution for {} - {}'.format(name, year))
     plt.xlabel('Score')
     plt.ylabel('Count')
@@ -81,8 +88,8 @@ def analyze(summary_path, name, num_trials, batchNumber, year):
     plt.cla()
     plt.clf()
 
-    sns.distplot(scores, kde=True, bins=bins,
-                 hist_kws=dict(cumulative=True))
+    sns.distplot(BIN_SCORES, kde=False, norm_hist=True, bins=bins,
+                 hist_kws=dict(weights=histogram, range=(stats['min'], stats['max']), cumulative=True))
     plt.title('Score CDF for {} - {}'.format(name, year))
     plt.xlabel('P')
     plt.ylabel('Count')
@@ -96,6 +103,7 @@ if __name__ == '__main__':
     num_batches = int(sys.argv[2])
     models_path = sys.argv[3]
     summary_path = sys.argv[4]
+    catalog = open_catalog()
 
     for year in range(2013, 2020):
         with open(models_path) as f:
@@ -103,4 +111,5 @@ if __name__ == '__main__':
         for batchNumber in range(num_batches):
             for model in models['models']:
                 name = model['modelName']
-                analyze(summary_path, name, num_trials, batchNumber, year)
+                analyze(summary_path, name, num_trials, batchNumber, year, catalog)
+    catalog.close()
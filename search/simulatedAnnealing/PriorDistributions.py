@@ -64,16 +64,28 @@ POOLED = 1
 
 
 data_cache = {}
+brackets_cache = {}
+
+
+def read_brackets(fmt):
+    # The brackets of every format are read once and sorted by year, so
+    # the brackets of any range of years are a slice of the list.
+    if fmt not in brackets_cache:
+        with open(dirname + '/../../generators/allBrackets%s.json' % fmt) as f:
+            brackets = sorted((int(a['bracket']['year']), a['bracket']['fullvector'])
+                              for a in json.load(f)['brackets'])
+        years = np.array([year for year, _ in brackets])
+        brackets_cache[fmt] = (years, [vector for _, vector in brackets])
+    return brackets_cache[fmt]
 
 
 def read_data(fmt, limit=0, start=1985):
     key = hash((fmt, limit, start))
     if key not in data_cache:
-        with open(dirname + '/../../generators/allBrackets%s.json' % fmt) as f:
-            vectors = [a['bracket']['fullvector']
-                       for a in json.load(f)['brackets']
-                       if (limit == 0 or int(a['bracket']['year']) < limit) and
-                       int(a['bracket']['year']) >= start]
+        years, all_vectors = read_brackets(fmt)
+        first = np.searchsorted(years, start, side='left')
+        last = len(years) if limit == 0 else np.searchsorted(years, limit, side='left')
+        vectors = all_vectors[first:max(first, last)]
 
         unpooled = pd.DataFrame([list(a) for a in vectors])
 